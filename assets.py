@@ -0,0 +1,227 @@
+import os
+import sys
+import mmap
+import hashlib
+import threading
+import pygame
+from concurrent.futures import Future, ThreadPoolExecutor
+from utility import load_image, create_image, TEXTURE_SPOTS, TEXTURE_BRIGHTNESS, TEXTURE_MAX_RADIUS
+from story import ImageRef, TextureRef
+
+# Сколько потоков загружают ресурсы
+MAX_LOADER_WORKERS = min(4, os.cpu_count() or 1)
+
+# Папка кэша готовых изображений (GAME_ASSET_CACHE=0 отключает кэш)
+CACHE_DIR = os.environ.get("GAME_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+USE_ASSET_CACHE = os.environ.get("GAME_ASSET_CACHE", "1") != "0"
+
+
+def display_pixel_format() -> str:
+    """Возвращает формат пикселей для `pygame.image.tobytes`, совпадающий с форматом экрана."""
+    display = pygame.display.get_surface()
+    if display is not None and display.get_bitsize() == 32:
+        masks = display.get_masks()[:3]
+        if sys.byteorder == "little" and masks == (0xff0000, 0xff00, 0xff):
+            return "BGRA"
+        if sys.byteorder == "little" and masks == (0xff, 0xff00, 0xff0000):
+            return "RGBA"
+    return "RGBX"
+
+
+class SurfaceCache:
+    """Этот класс хранит на диске уже масштабированные изображения в сыром виде.
+
+    Ключ записи - (хэш источника, размер, формат пикселей). Записи читаются через
+    `mmap` прямо в поверхность, без декодирования PNG и масштабирования.
+    При изменении источника старые записи для него удаляются."""
+
+    def __init__(self, directory: str = CACHE_DIR, pixel_format: str | None = None):
+        self.directory = directory
+        """Папка с файлами кэша."""
+        self.pixel_format = pixel_format or display_pixel_format()
+        """Формат пикселей в файлах кэша."""
+
+    def entry_prefix(self, name: str) -> str:
+        """Возвращает начало имени файлов записей одного источника."""
+        return name.replace(os.sep, "_").replace("/", "_").replace("-", "_") + "-"
+
+    def entry_path(self, name: str, source_hash: str, size: tuple[int, int]) -> str:
+        """Возвращает путь к файлу записи."""
+        return os.path.join(
+            self.directory,
+            f"{self.entry_prefix(name)}{source_hash[:16]}-{size[0]}x{size[1]}-{self.pixel_format}.raw"
+        )
+
+    def load(self, name: str, source_hash: str, size: tuple[int, int]) -> pygame.Surface | None:
+        """Возвращает изображение из кэша или `None`, если записи нет."""
+        path = self.entry_path(name, source_hash, size)
+        try:
+            with open(path, "rb") as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        if len(mapped) != size[0] * size[1] * len(self.pixel_format):
+            mapped.close()
+            return None
+        # Поверхность ссылается на отображенный файл; копия делается при convert()
+        return pygame.image.frombuffer(mapped, size, self.pixel_format)
+
+    def store(self, name: str, source_hash: str, surface: pygame.Surface):
+        """Сохраняет изображение в кэш и удаляет устаревшие записи того же источника."""
+        path = self.entry_path(name, source_hash, surface.get_size())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as file:
+                file.write(pygame.image.tobytes(surface, self.pixel_format))
+            os.replace(temp_path, path)
+
+            prefix = self.entry_prefix(name)
+            for entry in os.listdir(self.directory):
+                if entry.startswith(prefix) and entry.endswith(".raw") and entry != os.path.basename(path):
+                    os.remove(os.path.join(self.directory, entry))
+        except OSError:
+            # Кэш - только ускорение, без него игра работает как раньше
+            pass
+
+
+def file_hash(file_path: str) -> str:
+    """Возвращает хэш содержимого файла."""
+    with open(file_path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+class Asset:
+    """Этот класс описывает изображение, которое загружается в фоновом потоке.
+
+    Пока загрузка не закончилась, `get()` возвращает `None`."""
+
+    def __init__(self, future: Future):
+        self.future: Future | None = future
+        """Задача загрузки в пуле потоков (`None` после перевода изображения в формат экрана)."""
+        self.surface: pygame.Surface | None = None
+        """Готовое изображение в формате экрана."""
+
+    def is_ready(self) -> bool:
+        """Закончилась ли загрузка."""
+        future = self.future
+        return future is None or future.done()
+
+    def get(self) -> pygame.Surface | None:
+        """Возвращает изображение или `None`, если оно еще загружается.
+
+        Перевод в формат экрана делается здесь, в основном потоке. После него задача
+        загрузки больше не нужна: она держит исходное изображение (полноразмерное или
+        отображенное из кэша), поэтому ссылка на нее сбрасывается."""
+        if self.surface is None and self.future.done():
+            self.surface = self.future.result().convert()
+            self.future = None
+        return self.surface
+
+    def wait(self) -> pygame.Surface:
+        """Дожидается загрузки и возвращает изображение."""
+        if self.future is not None:
+            self.future.result()
+        return self.get()
+
+
+class AssetLoader:
+    """Этот класс загружает и масштабирует изображения в пуле потоков."""
+
+    def __init__(self, max_workers: int = MAX_LOADER_WORKERS, cache: SurfaceCache | None = None):
+        self.cache = cache
+        """Дисковый кэш готовых изображений (`None` - без кэша)."""
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asset-loader")
+        """Пул потоков загрузки."""
+        self.assets: list[Asset] = []
+        """Все запрошенные ресурсы."""
+        self.lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs) -> Asset:
+        """Запускает загрузку ресурса функцией `func` в фоне."""
+        asset = Asset(self.executor.submit(func, *args, **kwargs))
+        with self.lock:
+            self.assets.append(asset)
+        return asset
+
+    def image(self, file_path: str, scale: tuple[int, int] | None = None) -> Asset:
+        """Загружает картинку из файла и масштабирует ее до `scale`."""
+        return self.submit(self._load_image, file_path, scale)
+
+    def texture(self, base_color, width: int, height: int, seed: int | None = None) -> Asset:
+        """Создает процедурную текстуру (см. `create_image`).
+
+        В кэш попадают только текстуры с `seed` - остальные каждый раз разные."""
+        return self.submit(self._create_texture, tuple(base_color), width, height, seed)
+
+    def _load_image(self, file_path: str, scale: tuple[int, int] | None) -> pygame.Surface:
+        if self.cache is None or scale is None:
+            return load_image(file_path, scale=scale, convert=False)
+
+        source_hash = file_hash(file_path)
+        surface = self.cache.load(file_path, source_hash, scale)
+        if surface is None:
+            surface = load_image(file_path, scale=scale, convert=False)
+            self.cache.store(file_path, source_hash, surface)
+        return surface
+
+    def _create_texture(self, base_color: tuple, width: int, height: int, seed: int | None) -> pygame.Surface:
+        if self.cache is None or seed is None:
+            return create_image(base_color, width, height, seed)
+
+        name = "texture_" + "_".join(str(channel) for channel in base_color[:3]) + f"_{seed}"
+        parameters = f"{TEXTURE_SPOTS}:{TEXTURE_BRIGHTNESS}:{TEXTURE_MAX_RADIUS}"
+        source_hash = hashlib.sha1(parameters.encode()).hexdigest()
+        surface = self.cache.load(name, source_hash, (width, height))
+        if surface is None:
+            surface = create_image(base_color, width, height, seed)
+            self.cache.store(name, source_hash, surface)
+        return surface
+
+    def progress(self) -> tuple[int, int]:
+        """Возвращает количество загруженных и всех запрошенных ресурсов."""
+        with self.lock:
+            return sum(asset.is_ready() for asset in self.assets), len(self.assets)
+
+    def is_done(self) -> bool:
+        """Загружены ли все запрошенные ресурсы."""
+        done, total = self.progress()
+        return done == total
+
+    def shutdown(self, wait: bool = True):
+        """Останавливает пул потоков, отменяя еще не начатые загрузки."""
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class AssetRegistry(AssetLoader):
+    """Этот класс хранит все ресурсы игры независимо от `Game`.
+
+    Повторный запрос того же ресурса возвращает уже загруженный (или загружающийся)
+    `Asset`, поэтому перезапуск игры не загружает изображения заново."""
+
+    def __init__(self, max_workers: int = MAX_LOADER_WORKERS, cache: SurfaceCache | None = None):
+        super().__init__(max_workers, cache)
+        self.registry: dict[tuple, Asset] = {}
+        """Запрошенные ресурсы по ключу."""
+
+    def lookup(self, key: tuple, request) -> Asset:
+        """Возвращает ресурс по ключу, запуская загрузку функцией `request()` при первом запросе."""
+        asset = self.registry.get(key)
+        if asset is None:
+            asset = request()
+            self.registry[key] = asset
+        return asset
+
+    def image(self, file_path: str, scale: tuple[int, int] | None = None) -> Asset:
+        return self.lookup(("image", file_path, scale), lambda: super(AssetRegistry, self).image(file_path, scale))
+
+    def texture(self, base_color, width: int, height: int, seed: int | None = None) -> Asset:
+        key = ("texture", tuple(base_color), width, height, seed)
+        return self.lookup(key, lambda: super(AssetRegistry, self).texture(base_color, width, height, seed))
+
+    def resolve(self, ref: ImageRef | TextureRef, size: tuple[int, int]) -> Asset:
+        """Возвращает ресурс для ссылки из сюжета, масштабированный до `size`."""
+        if isinstance(ref, ImageRef):
+            return self.image(ref.path, scale=size)
+        return self.texture(ref.base_color, size[0], size[1], ref.seed)
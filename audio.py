@@ -0,0 +1,160 @@
+"""Звук игры.
+
+Длинные дорожки (музыка, фоновый шум, дикторский текст) проигрываются потоком с
+диска через `pygame.mixer.music`. Короткие звуки декодируются в `pygame.mixer.Sound`
+в фоновом потоке и хранятся в кэше, ограниченном по памяти. Поэтому ни один вызов
+не ждет чтения и декодирования файла: если звук еще не готов, он начнет играть в
+`update`, как только декодирование закончится.
+
+При смене звука старый звук затухает, а новый нарастает. Две потоковые дорожки
+одновременно играть не могут, поэтому новая дорожка начинается после затухания старой.
+
+Если звук недоступен (`pygame.mixer` не инициализирован), все методы ничего не делают.
+"""
+import os
+import warnings
+import pygame
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from story import SoundRef
+
+# Сколько памяти могут занимать декодированные звуки (байт)
+MAX_SOUND_CACHE_BYTES = 32 * 1024 * 1024
+# Файлы больше этого размера проигрываются потоком, если в ссылке не указано иное (байт)
+STREAM_MIN_BYTES = 1024 * 1024
+# Длительность затухания и нарастания при смене звука (мс)
+CROSSFADE_MS = 800
+
+
+def is_stream(ref: SoundRef) -> bool:
+    """Нужно ли проигрывать звук потоком."""
+    if ref.stream is not None:
+        return ref.stream
+    try:
+        return os.path.getsize(ref.path) >= STREAM_MIN_BYTES
+    except OSError:
+        return False
+
+
+def sound_size(sound: pygame.mixer.Sound) -> int:
+    """Возвращает размер декодированного звука в байтах."""
+    frequency, sample_format, channels = pygame.mixer.get_init()
+    return int(sound.get_length() * frequency) * channels * (abs(sample_format) // 8)
+
+
+class AudioManager:
+    """Этот класс проигрывает звуки сцен и хранит декодированные звуки."""
+
+    def __init__(self, max_bytes: int = MAX_SOUND_CACHE_BYTES, crossfade_ms: int = CROSSFADE_MS):
+        self.max_bytes = max_bytes
+        """Сколько памяти могут занимать декодированные звуки."""
+        self.crossfade_ms = crossfade_ms
+        """Длительность затухания и нарастания."""
+        self.sounds: OrderedDict[str, pygame.mixer.Sound] = OrderedDict()
+        """Декодированные звуки по пути (от давно использованных к недавним)."""
+        self.sizes: dict[str, int] = {}
+        """Размер каждого декодированного звука."""
+        self.cached_bytes = 0
+        """Сколько памяти занимают декодированные звуки."""
+        self.pending: dict[str, Future] = {}
+        """Звуки, которые сейчас декодируются."""
+        self.failed: set[str] = set()
+        """Звуки, которые не удалось загрузить (о них уже предупредили)."""
+        self.executor: ThreadPoolExecutor | None = None
+        self.wanted: SoundRef | None = None
+        """Звук, который должен заиграть, как только будет декодирован."""
+        self.channel: pygame.mixer.Channel | None = None
+        """Канал, на котором играет текущий декодированный звук."""
+        self.next_track: str | None = None
+        """Потоковая дорожка, которая начнется после затухания текущей."""
+
+    @property
+    def available(self) -> bool:
+        return pygame.mixer.get_init() is not None
+
+    def preload(self, ref: SoundRef | None):
+        """Начинает декодировать звук в фоне (потоковые дорожки не загружаются заранее)."""
+        if ref is None or not self.available or is_stream(ref):
+            return
+        path = ref.path
+        if path in self.sounds or path in self.pending or path in self.failed:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-decoder")
+        self.pending[path] = self.executor.submit(pygame.mixer.Sound, path)
+
+    def play(self, ref: SoundRef | None):
+        """Плавно заменяет текущий звук звуком `ref` (`None` - тишина)."""
+        if not self.available:
+            return
+        self.fade_out()
+        if ref is None:
+            return
+        if is_stream(ref):
+            self.next_track = ref.path
+        else:
+            self.preload(ref)
+            self.wanted = ref
+        self.update()
+
+    def fade_out(self):
+        """Плавно останавливает все звуки."""
+        if not self.available:
+            return
+        self.wanted = None
+        self.next_track = None
+        if self.channel is not None:
+            self.channel.fadeout(self.crossfade_ms)
+            self.channel = None
+        pygame.mixer.music.fadeout(self.crossfade_ms)
+
+    def update(self):
+        """Забирает декодированные звуки и запускает отложенные звуки; вызывается каждый кадр."""
+        if not self.available:
+            return
+        for path, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[path]
+                self._store(path, future)
+
+        if self.wanted is not None:
+            sound = self.sounds.get(self.wanted.path)
+            if sound is not None:
+                self.sounds.move_to_end(self.wanted.path)
+                self.channel = sound.play(fade_ms=self.crossfade_ms)
+                self.wanted = None
+            elif self.wanted.path not in self.pending:
+                # Загрузить не удалось
+                self.wanted = None
+
+        if self.next_track is not None and not pygame.mixer.music.get_busy():
+            try:
+                pygame.mixer.music.load(self.next_track)
+                pygame.mixer.music.play(fade_ms=self.crossfade_ms)
+            except pygame.error as error:
+                self._warn(self.next_track, error)
+            self.next_track = None
+
+    def _store(self, path: str, future: Future):
+        try:
+            sound = future.result()
+        except (pygame.error, OSError) as error:
+            self._warn(path, error)
+            return
+        self.sounds[path] = sound
+        self.sizes[path] = sound_size(sound)
+        self.cached_bytes += self.sizes[path]
+        # Вытесняются давно использованные звуки; играющий звук держит его канал
+        while self.cached_bytes > self.max_bytes and len(self.sounds) > 1:
+            old_path, _ = self.sounds.popitem(last=False)
+            self.cached_bytes -= self.sizes.pop(old_path)
+
+    def _warn(self, path: str, error: Exception):
+        if path not in self.failed:
+            self.failed.add(path)
+            warnings.warn(f"Sound '{path}' could not be loaded: {error}")
+
+    def shutdown(self):
+        """Отменяет декодирование, которое еще не началось."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,55 @@
+"""Сравнивает скорость `create_image` (NumPy) и `create_image_loop` (по одному пятну).
+
+Колонка "заливка" - время создания и заливки поверхности без текстуры,
+это нижняя граница для обеих реализаций.
+
+Запуск: python benchmarks/bench_create_image.py
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+from utility import create_image, create_image_loop
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "4K": (3840, 2160),
+}
+REPEATS = 20
+
+
+def fill_only(base_color, width, height, seed=None):
+    surface = pygame.Surface((width, height), 0, 32)
+    surface.fill(base_color)
+    return surface
+
+
+def best_time(func, *args) -> float:
+    """Возвращает лучшее время из `REPEATS` запусков в секундах."""
+    best = float("inf")
+    for seed in range(REPEATS):
+        start = time.perf_counter()
+        func(*args, seed=seed)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    pygame.init()
+    base_color = (70, 90, 80)
+    print(f"{'разрешение':<12}{'заливка, мс':>13}{'цикл, мс':>12}{'NumPy, мс':>12}{'ускорение':>12}")
+    for name, (width, height) in RESOLUTIONS.items():
+        fill_time = best_time(fill_only, base_color, width, height)
+        loop_time = best_time(create_image_loop, base_color, width, height)
+        vector_time = best_time(create_image, base_color, width, height)
+        print(f"{name:<12}{fill_time * 1000:>13.1f}{loop_time * 1000:>12.1f}{vector_time * 1000:>12.1f}"
+              f"{loop_time / vector_time:>11.1f}x")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""Набор замеров скорости горячих мест игры (без окна, SDL_VIDEODRIVER=dummy).
+
+Замеряются:
+    create_image.*    процедурная текстура при разных разрешениях
+    load_image.*      загрузка и масштабирование картинки при разных разрешениях
+    wrap_text.*       разбиение длинного русского текста на строки (без кэша и с кэшем)
+    draw.*            отрисовка каждого состояния игры (`Game.draw_*`), готовые слои и пересборка
+    get_scenes.*      загрузка сюжета: открытие, разбор всех сцен, компиляция
+    facts.*           выбор исторической справки в базе из FACTS_COUNT справок
+    cold_start.*      запуск процесса до первого кадра (с прогретым и пустым кэшем ресурсов)
+
+Результаты сохраняются в JSON и сравниваются с базовыми (`baseline.json`): замер
+считается регрессией, если его медиана выросла больше чем на порог. Общий порог
+задается `--threshold`, пороги отдельных замеров - в поле "thresholds" базового файла.
+
+Запуск:
+    python benchmarks/run_benchmarks.py                      сравнить с baseline.json
+    python benchmarks/run_benchmarks.py --update-baseline    записать новые базовые значения
+    python benchmarks/run_benchmarks.py --only draw wrap_text --output results.json
+    GAME_RENDER_SIZE=1280x720 python benchmarks/run_benchmarks.py --only draw --output scaled.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import platform
+import statistics
+import subprocess
+import tempfile
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# Замеры не должны восстанавливать или затирать журнал настоящей партии
+os.environ["GAME_JOURNAL"] = ""
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PACKAGE_DIR)
+
+import numpy
+import pygame
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+# Допустимое замедление относительно базового значения (0.25 - на 25%)
+DEFAULT_THRESHOLD = 0.25
+REPEATS = 20
+COLD_START_REPEATS = 5
+# Размер базы справок для замеров
+FACTS_COUNT = 10000
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4K": (3840, 2160),
+}
+BASE_COLOR = (70, 90, 80)
+IMAGE_FILE = os.path.join(PACKAGE_DIR, "pic1.png")
+
+# Запуск игры до первого кадра в отдельном процессе
+COLD_START_SCRIPT = """
+import os, sys
+sys.path.insert(0, {package_dir!r})
+import game
+game.Game().draw()
+os._exit(0)
+"""
+
+
+def measure(func, repeats: int = REPEATS, setup=None) -> list[float]:
+    """Возвращает время `repeats` вызовов `func` в секундах (`setup` вызывается перед каждым и не замеряется)."""
+    # Первый вызов - прогрев, он не учитывается
+    if setup is not None:
+        setup()
+    func()
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def bench_images(repeats: int) -> dict[str, list[float]]:
+    from utility import create_image, load_image
+    results = {}
+    for name, (width, height) in RESOLUTIONS.items():
+        seeds = iter(range(repeats + 1))
+        results[f"create_image.{name}"] = measure(
+            lambda: create_image(BASE_COLOR, width, height, seed=next(seeds)), repeats)
+        results[f"load_image.{name}"] = measure(
+            lambda: load_image(IMAGE_FILE, scale=(width, height), convert=False), repeats)
+    return results
+
+
+def long_cyrillic_text() -> str:
+    """Возвращает длинный текст из описаний сцен и последствий выборов."""
+    from story import get_scenes
+    paragraphs = [scene.text.replace("\n", " ") for scene in get_scenes()]
+    paragraphs += [choice.consequence.text for scene in get_scenes() for choice in scene.choices
+                   if hasattr(choice.consequence, "text")]
+    return " ".join(paragraphs)
+
+
+def bench_wrap_text(repeats: int) -> dict[str, list[float]]:
+    import game
+    from text_render import text_cache
+    text = game.Text(origin=(0, 0), width=game.WIDTH // 2, font=game.font_small, text=long_cyrillic_text())
+    return {
+        "wrap_text.uncached": measure(text.wrap_text, repeats, setup=text_cache.clear),
+        "wrap_text.cached": measure(text.wrap_text, repeats),
+    }
+
+
+def bench_draw(repeats: int) -> dict[str, list[float]]:
+    import game
+    game_instance = game.Game()
+    for scene in game_instance.story_scenes:
+        game_instance.scene_background(scene).wait()
+    game_instance.menu_background.wait()
+    game_instance.history_facts_background.wait()
+    game_instance.rng = random.Random(0)
+
+    def enter_choice():
+        game_instance.start_game()
+
+    def enter_result():
+        game_instance.start_game()
+        game_instance.process_choice(1)
+
+    def enter_history():
+        enter_result()
+        game_instance.begin_state_history()
+
+    def enter_game_over():
+        game_instance.game_over_reason = "Весь груз еды был утерян..."
+        game_instance.begin_state_game_over()
+
+    def enter_victory():
+        game_instance.stats = game.PlayerStats(150, 80, 70, 1200, 6)
+        game_instance.begin_victory()
+
+    states = {
+        "menu": (game_instance.reset_play_state, game_instance.draw_menu),
+        "choice": (enter_choice, game_instance.draw_game),
+        "result": (enter_result, game_instance.draw_result),
+        "history": (enter_history, game_instance.draw_history_fact),
+        "game_over": (enter_game_over, game_instance.draw_game_over),
+        "victory": (enter_victory, game_instance.draw_victory),
+    }
+    results = {}
+    for name, (enter, draw) in states.items():
+        enter()
+        results[f"draw.{name}"] = measure(draw, repeats)
+        results[f"draw.{name}.rebuild"] = measure(draw, repeats, setup=game_instance.layers.invalidate)
+    return results
+
+
+def bench_get_scenes(repeats: int) -> dict[str, list[float]]:
+    from story import get_scenes
+    from story_compiler import DEFAULT_SOURCE, compile_story
+    compiled_path = os.path.join(tempfile.mkdtemp(prefix="bench-story-"), "story.bin")
+    return {
+        "get_scenes.open": measure(get_scenes, repeats),
+        "get_scenes.all_scenes": measure(lambda: list(get_scenes()), repeats),
+        "get_scenes.compile": measure(lambda: compile_story(DEFAULT_SOURCE, compiled_path), repeats),
+    }
+
+
+def bench_facts(repeats: int) -> dict[str, list[float]]:
+    from facts import FactStore, FactCursor, date_key
+    from story import BLOCKADE_START, BLOCKADE_END, get_scenes
+    rng = random.Random(0)
+    days = (BLOCKADE_END - BLOCKADE_START).days
+    store = FactStore(os.path.join(tempfile.mkdtemp(prefix="bench-facts-"), "facts.db"))
+    store.add([(date_key(BLOCKADE_START + datetime.timedelta(days=rng.randrange(days + 1))), f"Справка {index}")
+               for index in range(FACTS_COUNT)])
+    cursor = FactCursor(store)
+    dates = iter([scene.date for scene in get_scenes()] * (repeats + 1))
+    return {
+        "facts.next": measure(lambda: cursor.next(next(dates), rng), repeats),
+    }
+
+
+def cold_start_time(cache_dir: str | None) -> float:
+    """Запускает игру в новом процессе и возвращает время до первого кадра."""
+    env = dict(os.environ)
+    if cache_dir is not None:
+        env["GAME_CACHE_DIR"] = cache_dir
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", COLD_START_SCRIPT.format(package_dir=PACKAGE_DIR)],
+                   env=env, cwd=PACKAGE_DIR, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def bench_cold_start(repeats: int) -> dict[str, list[float]]:
+    repeats = min(repeats, COLD_START_REPEATS)
+    # Первый запуск заполняет кэш ресурсов
+    cold_start_time(None)
+    return {
+        "cold_start.first_frame": [cold_start_time(None) for _ in range(repeats)],
+        "cold_start.first_frame.empty_cache": [cold_start_time(tempfile.mkdtemp(prefix="bench-cache-"))
+                                               for _ in range(repeats)],
+    }
+
+
+BENCHMARKS = {
+    "images": bench_images,
+    "wrap_text": bench_wrap_text,
+    "draw": bench_draw,
+    "get_scenes": bench_get_scenes,
+    "facts": bench_facts,
+    "cold_start": bench_cold_start,
+}
+
+
+def summarize(times: list[float]) -> dict:
+    """Возвращает сводку замера в миллисекундах."""
+    return {
+        "median_ms": statistics.median(times) * 1000,
+        "min_ms": min(times) * 1000,
+        "max_ms": max(times) * 1000,
+        "repeats": len(times),
+    }
+
+
+def environment() -> dict:
+    """Возвращает описание машины и версий, на которых сделаны замеры."""
+    display = pygame.display.get_surface()
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "screen": list(display.get_size()) if display is not None else None,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Печатает сравнение с базовыми значениями и возвращает имена замеров с регрессией."""
+    thresholds = baseline.get("thresholds", {})
+    base_results = baseline.get("results", {})
+    regressions = []
+    print(f"{'замер':<40}{'медиана, мс':>14}{'база, мс':>12}{'изменение':>12}")
+    for name, summary in results.items():
+        median = summary["median_ms"]
+        base = base_results.get(name)
+        if base is None:
+            print(f"{name:<40}{median:>14.3f}{'-':>12}{'новый':>12}")
+            continue
+        change = median / base["median_ms"] - 1 if base["median_ms"] else 0.0
+        limit = thresholds.get(name, threshold)
+        mark = ""
+        if change > limit:
+            regressions.append(name)
+            mark = f"  РЕГРЕССИЯ (порог {limit:+.0%})"
+        print(f"{name:<40}{median:>14.3f}{base['median_ms']:>12.3f}{change:>+12.1%}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры скорости игры.")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="запустить только эти группы замеров")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="повторов каждого замера")
+    parser.add_argument("--output", help="сохранить результаты в файл JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="файл базовых значений")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимое замедление медианы (0.25 - на 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="записать результаты как базовые")
+    args = parser.parse_args()
+
+    results = {}
+    for group in args.only or BENCHMARKS:
+        print(f"Замер: {group}...", file=sys.stderr)
+        for name, times in BENCHMARKS[group](args.repeats).items():
+            results[name] = summarize(times)
+    report = {"environment": environment(), "results": results}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    if args.update_baseline:
+        # Пороги отдельных замеров сохраняются, а результаты дополняются новыми
+        report["thresholds"] = baseline.get("thresholds", {})
+        report["results"] = {**baseline.get("results", {}), **results}
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+            file.write("\n")
+        print(f"Базовые значения записаны в {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"Регрессий: {len(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Исторические справки.
+
+Справки хранятся в базе SQLite с индексом по дате, поэтому база может содержать
+тысячи справок: игра выбирает только справки, близкие к дате текущей сцены, и
+читает текст одной выбранной справки. База открывается при первом запросе, а
+пустая база заполняется встроенными справками.
+
+Дополнить базу справками из файла JSON (список объектов с полями "date" и "text"):
+
+    python facts.py facts.json
+"""
+import os
+import sys
+import json
+import random
+import sqlite3
+import dataclasses
+from datetime import datetime, timedelta
+from story import BLOCKADE_START, BLOCKADE_END
+
+# Файл базы справок
+FACTS_PATH = os.environ.get("GAME_FACTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "facts.db"))
+# Насколько дата справки может отличаться от даты сцены (дни)
+FACT_WINDOW_DAYS = 90
+# Сколько раз справка выбирается наугад, прежде чем перебрать все непоказанные
+RANDOM_TRIES = 8
+
+# Справки, которыми заполняется пустая база
+BUILTIN_FACTS = [
+    ("1941-09-08", "Блокада Ленинграда длилась 872 дня - с 8 сентября 1941 года по 27 января 1944 года."),
+    ("1941-11-22", "Дорога жизни - ледовая трасса через Ладожское озеро. Зимой 1941-1942 по ней доставляли до 2000 тонн грузов ежедневно."),
+    ("1941-11-20", "Норма хлеба в ноябре 1941 года: 250 грамм для рабочих, 125 грамм для остальных. Люди умирали от голода на улицах."),
+    ("1942-01-22", "За время блокады по Дороге жизни эвакуировали более 1,3 млн человек, в основном женщин и детей."),
+    ("1941-12-15", "Температура зимой 1941-1942 опускалась до -32°C. Водители работали по 12-16 часов без отопления в кабинах."),
+    ("1943-03-30", "Всего по Дороге жизни в Ленинград доставили более 1,6 млн тонн грузов, что спасло жизни сотен тысяч людей."),
+    ("1941-12-01", "Каждый третий рейс заканчивался потерей грузовика - он либо проваливался под лёд, либо уничтожался авиацией."),
+    ("1943-01-18", "18 января 1943 года блокада была прорвана в ходе операции 'Искра', но полное освобождение наступило лишь год спустя."),
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS facts (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS facts_date ON facts (date);
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class Fact:
+    """Этот класс описывает историческую справку."""
+    fact_id: int
+    """Номер справки в базе."""
+    date: datetime
+    """Дата, к которой относится справка."""
+    text: str
+    """Текст справки."""
+
+
+def date_key(date: datetime) -> str:
+    """Возвращает дату в виде, в котором она хранится в базе (сравнивается как строка)."""
+    return date.strftime("%Y-%m-%d")
+
+
+class FactStore:
+    """Этот класс описывает базу исторических справок.
+
+    Соединение открывается при первом запросе. Если файл базы нельзя создать,
+    база держится в памяти и содержит только встроенные справки."""
+
+    def __init__(self, path: str = FACTS_PATH):
+        self.path = path
+        """Путь к файлу базы."""
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            try:
+                self._connection = sqlite3.connect(self.path)
+                self._connection.executescript(_SCHEMA)
+            except sqlite3.Error:
+                # Папка только для чтения - база в памяти
+                self._connection = sqlite3.connect(":memory:")
+                self._connection.executescript(_SCHEMA)
+            if self.count() == 0:
+                self.add(BUILTIN_FACTS)
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def add(self, facts: list[tuple[str, str]]):
+        """Добавляет справки (дата в виде "ГГГГ-ММ-ДД", текст)."""
+        with self.connection:
+            self.connection.executemany("INSERT INTO facts (date, text) VALUES (?, ?)", facts)
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM facts").fetchone()[0]
+
+    def count_between(self, start: datetime, end: datetime) -> int:
+        """Возвращает количество справок с датами от `start` до `end` включительно."""
+        return self.connection.execute("SELECT COUNT(*) FROM facts WHERE date BETWEEN ? AND ?",
+                                       (date_key(start), date_key(end))).fetchone()[0]
+
+    def id_between(self, start: datetime, end: datetime, position: int) -> int | None:
+        """Возвращает номер справки, стоящей `position`-й по дате среди справок от `start` до `end`."""
+        row = self.connection.execute(
+            "SELECT id FROM facts WHERE date BETWEEN ? AND ? ORDER BY date, id LIMIT 1 OFFSET ?",
+            (date_key(start), date_key(end), position)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def ids_between(self, start: datetime, end: datetime) -> list[int]:
+        """Возвращает номера справок с датами от `start` до `end` включительно (по индексу дат)."""
+        rows = self.connection.execute("SELECT id FROM facts WHERE date BETWEEN ? AND ?",
+                                       (date_key(start), date_key(end)))
+        return [fact_id for fact_id, in rows]
+
+    def get(self, fact_id: int) -> Fact | None:
+        """Возвращает справку по номеру или `None`, если ее нет в базе."""
+        row = self.connection.execute("SELECT date, text FROM facts WHERE id = ?", (fact_id,)).fetchone()
+        if row is None:
+            return None
+        return Fact(fact_id, datetime.strptime(row[0], "%Y-%m-%d"), row[1])
+
+
+class FactCursor:
+    """Этот класс выбирает справки для одной партии без повторов.
+
+    Сначала выбираются справки не дальше `window_days` дней от даты сцены, потом -
+    любые справки времени блокады. Когда показаны все справки, повторы начинаются заново."""
+
+    def __init__(self, store: FactStore, window_days: int = FACT_WINDOW_DAYS):
+        self.store = store
+        self.window = timedelta(days=window_days)
+        """Насколько дата справки может отличаться от даты сцены."""
+        self.shown: set[int] = set()
+        """Номера справок, уже показанных в этой партии."""
+
+    def reset(self):
+        """Начинает новую партию."""
+        self.shown.clear()
+
+    def next(self, date: datetime, rng: random.Random) -> Fact | None:
+        """Возвращает случайную еще не показанную справку, близкую к дате `date`."""
+        ranges = [
+            (max(date - self.window, BLOCKADE_START), min(date + self.window, BLOCKADE_END)),
+            (BLOCKADE_START, BLOCKADE_END),
+        ]
+        for start, end in ranges:
+            fact_id = self._pick(start, end, rng)
+            if fact_id is not None:
+                break
+        else:
+            # Все справки показаны - начинаем сначала
+            self.shown.clear()
+            fact_id = self._pick(*ranges[0], rng) or self._pick(*ranges[1], rng)
+            if fact_id is None:
+                return None
+
+        self.shown.add(fact_id)
+        return self.store.get(fact_id)
+
+    def _pick(self, start: datetime, end: datetime, rng: random.Random) -> int | None:
+        """Выбирает случайную непоказанную справку с датой от `start` до `end`.
+
+        Обычно показанных справок мало, поэтому справка выбирается по случайному месту в
+        индексе дат, и все справки промежутка читаются только если попытки не удались."""
+        count = self.store.count_between(start, end)
+        if count == 0:
+            return None
+        for _ in range(RANDOM_TRIES):
+            fact_id = self.store.id_between(start, end, rng.randrange(count))
+            if fact_id not in self.shown:
+                return fact_id
+        candidates = [fact_id for fact_id in self.store.ids_between(start, end) if fact_id not in self.shown]
+        return rng.choice(candidates) if candidates else None
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("usage: python facts.py facts.json", file=sys.stderr)
+        sys.exit(2)
+    with open(sys.argv[1], encoding="utf-8") as file:
+        items = json.load(file)
+    store = FactStore()
+    try:
+        facts = [(date_key(datetime.strptime(item["date"], "%Y-%m-%d")), item["text"]) for item in items]
+    except (KeyError, TypeError, ValueError) as error:
+        print(f"{sys.argv[1]}: bad fact ({error})", file=sys.stderr)
+        sys.exit(1)
+    store.add(facts)
+    print(f"{store.path}: {store.count()} справок")
+
+
+if __name__ == "__main__":
+    main()
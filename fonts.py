@@ -0,0 +1,160 @@
+"""Шрифты игры.
+
+`pygame.font.SysFont` при первом вызове опрашивает системную базу шрифтов, а это
+заметная часть времени запуска. `FontManager` ищет файл шрифта один раз, сохраняет
+результат в кэше на диске и при следующих запусках открывает файлы сразу.
+Игра хранит ссылки на шрифты (`FontRef`), а объекты `pygame.font.Font` создаются
+только при первой отрисовке текста нужного размера.
+"""
+import os
+import sys
+import json
+import time
+import warnings
+import dataclasses
+import pygame
+from assets import CACHE_DIR
+
+# Файл с найденными путями к шрифтам
+FONT_CACHE_PATH = os.path.join(CACHE_DIR, "fonts.json")
+
+
+def font_dirs() -> list[str]:
+    """Возвращает папки, в которые устанавливаются шрифты, и папки кэша fontconfig."""
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        return [os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts"),
+                os.path.join(os.environ.get("LOCALAPPDATA", home), "Microsoft", "Windows", "Fonts")]
+    if sys.platform == "darwin":
+        return ["/Library/Fonts", "/System/Library/Fonts", os.path.join(home, "Library", "Fonts")]
+    return ["/usr/share/fonts", "/usr/local/share/fonts", os.path.join(home, ".fonts"),
+            os.path.join(home, ".local", "share", "fonts"), "/var/cache/fontconfig",
+            os.path.join(home, ".cache", "fontconfig")]
+
+
+def fonts_signature() -> dict[str, int]:
+    """Возвращает время изменения папок шрифтов (0 - папки нет).
+
+    Установка шрифта меняет его папку или кэш fontconfig, поэтому по этой подписи видно,
+    что ненайденный раньше шрифт пора искать заново."""
+    signature = {}
+    for path in font_dirs():
+        try:
+            signature[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            signature[path] = 0
+    return signature
+
+
+@dataclasses.dataclass(frozen=True)
+class FontRef:
+    """Этот класс описывает ссылку на шрифт (см. `FontManager.get`)."""
+    name: str
+    """Имя шрифта в системе."""
+    size: int
+    """Размер шрифта."""
+
+
+class FontManager:
+    """Этот класс находит файлы шрифтов по именам и создает шрифты нужных размеров.
+
+    Если шрифт не найден, используется встроенный шрифт pygame и выводится предупреждение.
+    Ненайденные шрифты тоже попадают в кэш, но вместе с подписью папок шрифтов
+    (`fonts_signature`): когда в системе появляются новые шрифты, подпись меняется,
+    и такие шрифты ищутся заново."""
+
+    def __init__(self, cache_path: str | None = FONT_CACHE_PATH):
+        start = time.perf_counter()
+        self.cache_path = cache_path
+        """Файл кэша путей (`None` - без кэша)."""
+        self.signature = fonts_signature() if cache_path is not None else {}
+        """Подпись папок шрифтов на момент запуска (см. `fonts_signature`)."""
+        self.paths: dict[str, str | None] = self._load_cache()
+        """Найденные пути по имени шрифта (`None` - шрифт не найден)."""
+        self.fonts: dict[tuple[str, int], pygame.font.Font] = {}
+        """Созданные шрифты по (имя, размер)."""
+        self.missing: set[str] = set()
+        """Шрифты, о замене которых уже предупредили."""
+        self.resolve_time = time.perf_counter() - start
+        """Сколько секунд ушло на поиск файлов шрифтов (включая чтение кэша)."""
+        self.load_time = 0.0
+        """Сколько секунд ушло на открытие шрифтов."""
+        self.system_lookups = 0
+        """Сколько шрифтов пришлось искать в системе (а не в кэше)."""
+
+    def _load_cache(self) -> dict[str, str | None]:
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, encoding="utf-8") as file:
+                cache = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(cache, dict):
+            return {}
+        # Старые версии кэша хранили только словарь найденных путей
+        found, missing = cache.get("found", cache), cache.get("missing", {})
+        if not isinstance(found, dict) or not isinstance(missing, dict):
+            return {}
+        # Шрифт могли удалить - такие записи ищутся заново (как и `null` из старых версий кэша)
+        paths = {name: path for name, path in found.items() if isinstance(path, str) and os.path.isfile(path)}
+        if missing.get("signature") == self.signature:
+            paths.update((name, None) for name in missing.get("names", []) if name not in paths)
+        return paths
+
+    def _store_cache(self):
+        if self.cache_path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            cache = {
+                "found": {name: path for name, path in self.paths.items() if path is not None},
+                "missing": {
+                    "signature": self.signature,
+                    "names": sorted(name for name, path in self.paths.items() if path is None),
+                },
+            }
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(cache, file, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            # Кэш - только ускорение
+            pass
+
+    def resolve(self, name: str) -> str | None:
+        """Возвращает путь к файлу шрифта `name` или `None`, если шрифта нет в системе."""
+        if name in self.paths:
+            return self.paths[name]
+
+        start = time.perf_counter()
+        path = pygame.font.match_font(name)
+        self.resolve_time += time.perf_counter() - start
+        self.system_lookups += 1
+        self.paths[name] = path
+        self._store_cache()
+        return path
+
+    def font(self, name: str, size: int) -> pygame.font.Font:
+        """Возвращает шрифт `name` размера `size`, создавая его при первом запросе."""
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            path = self.resolve(name)
+            if path is None and name not in self.missing:
+                self.missing.add(name)
+                warnings.warn(f"Font '{name}' not found, using the default pygame font")
+            start = time.perf_counter()
+            font = pygame.font.Font(path, size)
+            self.load_time += time.perf_counter() - start
+            self.fonts[key] = font
+        return font
+
+    def get(self, ref: FontRef) -> pygame.font.Font:
+        """Возвращает шрифт по ссылке, создавая его при первом запросе."""
+        return self.font(ref.name, ref.size)
+
+    def report(self) -> str:
+        """Возвращает строку о времени, потраченном на шрифты."""
+        return (f"Шрифты: поиск {self.resolve_time * 1000:.1f} мс (в системе: {self.system_lookups}), "
+                f"загрузка {self.load_time * 1000:.1f} мс ({len(self.fonts)} шт.)")
@@ -1,16 +1,49 @@
+import os
 import pygame
 from pygame import mixer
 import dataclasses
+from collections import OrderedDict
+from typing import Any, Callable
 from utility import *
+from story import *
+from story_graph import END, graph_of
+from text_render import text_cache, wrap_lines
+from assets import Asset, AssetRegistry, SurfaceCache, USE_ASSET_CACHE
+from journal import Journal, RecordingRandom, JOURNAL_PATH, replay
+from profiler import Profiler, IDLE_SECTION, PROFILE_SUMMARY_PATH
+from fonts import FontManager, FontRef
+from facts import FactStore, FactCursor
+from audio import AudioManager
 
 # Инициализация Pygame
 pygame.init()
-mixer.init()
+try:
+    mixer.init()
+except pygame.error:
+    # Без звуковой карты игра идет без звука (см. `audio`)
+    pass
+
+
+def parse_render_size(value: str) -> tuple[int, int] | None:
+    """Разбирает разрешение вида "1280x720" (`None` - пустая строка или ошибка)."""
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        return None
+    return (width, height) if width > 0 and height > 0 else None
+
 
 # Настройки экрана
+# Логическое разрешение (GAME_RENDER_SIZE=1280x720): кадр рисуется в нем, а на экран
+# растягивается один раз средствами SDL. Без переменной игра рисует в разрешении экрана.
+RENDER_SIZE = parse_render_size(os.environ.get("GAME_RENDER_SIZE", ""))
 info = pygame.display.Info()
-WIDTH, HEIGHT = info.current_w, info.current_h
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
+if RENDER_SIZE is not None:
+    WIDTH, HEIGHT = RENDER_SIZE
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN | pygame.SCALED)
+else:
+    WIDTH, HEIGHT = info.current_w, info.current_h
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
 pygame.display.set_caption("Дорога жизни")
 
 # Цвета
@@ -23,11 +56,23 @@ DARK_RED = pygame.Color(100, 0, 0)
 GOLD = pygame.Color(218, 165, 32)
 GREEN = pygame.Color(50, 150, 50)
 
-# Шрифты (адаптивные размеры)
-font_large = pygame.font.SysFont('arial', HEIGHT // 20)
-font_medium = pygame.font.SysFont('arial', HEIGHT // 25)
-font_small = pygame.font.SysFont('arial', HEIGHT // 30)
-font_historical = pygame.font.SysFont('timesnewroman', HEIGHT // 25)
+# Все изображения игры (загружаются в фоне и переживают перезапуск игры)
+assets = AssetRegistry(cache=SurfaceCache() if USE_ASSET_CACHE else None)
+# Журнал партии для восстановления после перезапуска
+journal = Journal(JOURNAL_PATH or None)
+# Замеры времени кадров (GAME_PROFILER=1 или клавиша F3)
+profiler = Profiler()
+# Исторические справки (база открывается при первом показе справки)
+fact_store = FactStore()
+# Звуки сцен
+audio = AudioManager()
+
+# Шрифты (адаптивные размеры; создаются при первой отрисовке текста, см. `FontManager`)
+fonts = FontManager()
+font_large = FontRef('arial', HEIGHT // 20)
+font_medium = FontRef('arial', HEIGHT // 25)
+font_small = FontRef('arial', HEIGHT // 30)
+font_historical = FontRef('timesnewroman', HEIGHT // 25)
 
 STATE_MENU = 0
 STATE_CHOICE = 1
@@ -36,9 +81,30 @@ STATE_HISTORY = 3
 STATE_GAME_OVER = 4
 STATE_VICTORY = 5
 
+# Имена состояний для профилировщика
+STATE_NAMES = {
+    STATE_MENU: "menu",
+    STATE_CHOICE: "choice",
+    STATE_RESULT: "result",
+    STATE_HISTORY: "history",
+    STATE_GAME_OVER: "game_over",
+    STATE_VICTORY: "victory",
+}
+
 # Ограничение частоты кадров
 MAX_FPS = 30
 
+# Перерисовывать экран только когда что-то изменилось (GAME_EVENT_DRIVEN_REDRAW=0 - каждый кадр)
+EVENT_DRIVEN_REDRAW = os.environ.get("GAME_EVENT_DRIVEN_REDRAW", "1") != "0"
+# Сколько ждать событий в режиме простоя (мс)
+IDLE_WAIT_MS = 250
+
+# На сколько переходов вперед загружаются фоны сцен
+PREFETCH_DEPTH = 2
+
+# Область панели параметров внизу экрана
+STATUS_BAR_RECT = pygame.Rect(0, HEIGHT - 80, WIDTH, 80)
+
 @dataclasses.dataclass
 class Button:
     """Этот класс описывает кнопку на экране (без текста)."""
@@ -51,10 +117,12 @@ class Button:
     outline_color: pygame.Color = dataclasses.field(default_factory=lambda: pygame.Color(WHITE))
     """Цвет обводки."""
 
-    def draw(self):
-        """Отрисовывает кнопку на экране."""
-        pygame.draw.rect(screen, self.fill_color, self.rect)
-        pygame.draw.rect(screen, self.outline_color, self.rect, self.outline_width)
+    def draw(self, surface: pygame.Surface | None = None):
+        """Отрисовывает кнопку на экране (или на переданной поверхности)."""
+        if surface is None:
+            surface = screen
+        pygame.draw.rect(surface, self.fill_color, self.rect)
+        pygame.draw.rect(surface, self.outline_color, self.rect, self.outline_width)
     
     def contains_point(self, point: tuple[int, int]) -> bool:
         """Проверяет находится ли курсор внутри кнопки."""
@@ -65,7 +133,7 @@ class Text:
     """Этот класс описывает текст на экране."""
     origin: tuple[int, int]
     """Точка - основание текста."""
-    font: pygame.font.Font
+    font: FontRef
     """Шрифт текста."""
     text: str = "Это Текст!"
     """Текст."""
@@ -78,55 +146,199 @@ class Text:
     should_center: bool = True
     """Нужно ли центрировать текст относительно его основания."""
 
-    def draw(self):
-        """отрисовывает текст на экран"""
+    def draw(self, surface: pygame.Surface | None = None):
+        """отрисовывает текст на экран (или на переданную поверхность)"""
+        if surface is None:
+            surface = screen
+        font = fonts.get(self.font)
         current_y = self.origin[1]
         for line in self.wrap_text():
-            text_surface = self.font.render(line, True, self.color)
-            if self.should_center:
-                x = self.origin[0] - text_surface.get_width()//2
-            else:
-                x = self.origin[0]
-
-            screen.blit(text_surface, (x, current_y))
-            current_y += text_surface.get_height()
+            current_y += text_cache.draw_line(surface, font, line, True, self.color,
+                                              (self.origin[0], current_y), center=self.should_center)
     
     def wrap_text(self):
-        """разбивает текст на отдельные строки"""
-        newlines = self.text.split('\n')
+        """разбивает текст на отдельные строки (результат кэшируется, см. `wrap_lines`)"""
+        font = fonts.get(self.font)
+        return text_cache.wrap(self.text, font, self.width, lambda: wrap_lines(self.text, font, self.width))
 
-        lines = []
-        current_line = []
-        
-        for newline in newlines:
-            if self.width <= 0:
-                lines.append(newline)
-                continue
-            
-            for word in newline.split(' '):
-                test_line = ' '.join(current_line + [word])
-                test_width = self.font.size(test_line)[0]
-                
-                if test_width < self.width:
-                    current_line.append(word)
-                else:
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-            
-            if current_line:
-                lines.append(' '.join(current_line))
-                current_line = []
-        
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-        
-        return lines
+@dataclasses.dataclass
+class StatusWidget:
+    """Этот класс описывает элемент панели параметров, привязанный к одному значению.
+
+    Текст элемента обновляется только когда меняется привязанное значение."""
+    text: Text
+    """Текст элемента (координаты относительно панели)."""
+    value: Callable[[], Any]
+    """Функция, возвращающая привязанное значение."""
+    template: str
+    """Шаблон текста; значение подставляется через `str.format`."""
+    bar: Callable[[Any], tuple[float, Any]] | None = None
+    """Функция, возвращающая заполненность полоски (от 0 до 1) и ее цвет."""
+    drawn_value: Any = None
+    """Значение, для которого сейчас сформирован текст."""
+
+    def draw(self, surface: pygame.Surface, value, bar_width: int):
+        """Отрисовывает элемент на поверхность панели."""
+        if value != self.drawn_value:
+            self.text.text = self.template.format(*value) if isinstance(value, tuple) else self.template.format(value)
+            self.drawn_value = value
+        self.text.draw(surface)
+
+        if self.bar is not None:
+            fill, color = self.bar(value)
+            bar_rect = pygame.Rect(self.text.origin[0], 40, bar_width - 20, 15)
+            pygame.draw.rect(surface, GRAY, bar_rect)
+            pygame.draw.rect(surface, color, (bar_rect.x, bar_rect.y, bar_rect.width * fill, bar_rect.height))
+
+def food_bar(food: int):
+    return min(1.0, food / 250), GOLD  # Ограничение до 100%
+
+def health_bar(health: int):
+    # Цвет здоровья зависит от уровня
+    if health > 50:
+        return health / 100, GREEN
+    elif health > 25:
+        return health / 100, (255, 165, 0)  # оранжевый
+    else:
+        return health / 100, RED
+
+def morale_bar(morale: int):
+    # Цвет морали зависит от уровня
+    if morale > 60:
+        return morale / 100, BLUE
+    elif morale > 30:
+        return morale / 100, (100, 100, 255)  # светлосиний
+    else:
+        return morale / 100, (150, 150, 255)  # бледно-синий
+
+class StatusBar:
+    """Этот класс описывает панель параметров игрока внизу экрана.
+
+    Виджеты панели создаются один раз, а сама панель хранится в отдельной поверхности
+    и пересобирается только когда меняется какое-то из привязанных значений."""
+
+    def __init__(self, game: "Game"):
+        self.rect = STATUS_BAR_RECT
+        """Область панели на экране."""
+        self.surface = pygame.Surface(self.rect.size).convert()
+        """Собранная панель."""
+        self.drawn_values = None
+        """Значения, для которых собрана панель."""
+        # Адаптивные размеры для полосок
+        self.bar_width = WIDTH // 6
+        """Ширина колонки панели."""
+
+        def widget_text(x: int) -> Text:
+            return Text(origin=(x, 10), font=font_small, color=WHITE, should_center=False)
+
+        self.widgets = [
+            StatusWidget(
+                text=widget_text(20),
+                value=lambda: (game.scenes_played + 1, game.scenes_played + game.story_graph.remaining[game.scene_index]),
+                template="Этап: {0}/{1}"
+            ),
+            StatusWidget(
+                text=widget_text(self.bar_width),
+                value=lambda: game.stats.food,
+                template="Продовольствие: {0} кг",
+                bar=food_bar
+            ),
+            StatusWidget(
+                text=widget_text(self.bar_width * 2),
+                value=lambda: game.stats.health,
+                template="Здоровье: {0}%",
+                bar=health_bar
+            ),
+            StatusWidget(
+                text=widget_text(self.bar_width * 3),
+                value=lambda: game.stats.morale,
+                template="Боевой дух: {0}%",
+                bar=morale_bar
+            ),
+            # Дополнительная информация
+            StatusWidget(
+                text=widget_text(self.bar_width * 4),
+                value=lambda: game.stats.total_delivered,
+                template="Доставлено: {0} кг"
+            ),
+            StatusWidget(
+                text=widget_text(self.bar_width * 5),
+                value=lambda: game.stats.evacuated,
+                template="Эвак-но: {0} ч."
+            ),
+        ]
+        """Элементы панели."""
+
+    def draw(self, surface: pygame.Surface | None = None):
+        """Отрисовывает панель, пересобирая ее только при изменении значений."""
+        if surface is None:
+            surface = screen
+
+        values = tuple(widget.value() for widget in self.widgets)
+        if values != self.drawn_values:
+            self.surface.fill(BLACK)
+            for widget, value in zip(self.widgets, values):
+                widget.draw(self.surface, value, self.bar_width)
+            self.drawn_values = values
+
+        surface.blit(self.surface, self.rect)
+
+class StaticLayers:
+    """Этот класс хранит заранее собранные статичные слои экрана.
+
+    Слой содержит фон, затемнение и неизменяемые элементы состояния и собирается
+    один раз на ключ (состояние, сцена). Каждый кадр слой просто копируется на экран.
+    При переполнении удаляется слой, который дольше всех не использовался, поэтому
+    слои меню и справки, не зависящие от сцены, не пересобираются при смене сцены."""
+
+    def __init__(self, max_layers: int = 4):
+        self.max_layers = max_layers
+        """Сколько слоев хранить одновременно."""
+        self.layers: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+        """Собранные слои по ключу (от давно использованных к недавним)."""
+
+    def get(self, key: tuple, build) -> pygame.Surface:
+        """Возвращает слой по ключу, собирая его функцией `build(surface)` при отсутствии."""
+        layer = self.layers.get(key)
+        if layer is not None:
+            self.layers.move_to_end(key)
+            return layer
+
+        layer = pygame.Surface((WIDTH, HEIGHT)).convert()
+        build(layer)
+        if len(self.layers) >= self.max_layers:
+            self.layers.popitem(last=False)
+        self.layers[key] = layer
+        return layer
+
+    def invalidate(self):
+        """Удаляет все собранные слои."""
+        self.layers.clear()
+
+def blit_background(surface: pygame.Surface, background: Asset | None, fallback_color: pygame.Color):
+    """Рисует фон, если он уже загружен, иначе заливает поверхность запасным цветом."""
+    image = background.get() if background else None
+    if image is not None:
+        surface.blit(image, (0, 0))
+    else:
+        surface.fill(fallback_color)
+
+def blit_overlay(surface: pygame.Surface, rect: pygame.Rect, alpha: int):
+    """Затемняет область поверхности полупрозрачным черным."""
+    overlay = pygame.Surface(rect.size, pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, alpha))
+    surface.blit(overlay, rect.topleft)
 
 class Game:
     def __init__(self):
         self.is_running = True  # Должна ли игра продолжать работать
         self.fps_clock = pygame.time.Clock()  # Часы для ограничения частоты кадров
+        self.redraw_all = True  # Нужно ли перерисовать весь экран
+        self.dirty_rects: list[pygame.Rect] = []  # Области экрана, которые нужно перерисовать
+        self.drawn_stats = None  # Параметры игрока на момент последней отрисовки
+        self.layers = StaticLayers()  # Статичные слои состояний
+        self.rng = random.Random()  # Генератор случайных чисел партии
+        self.drawn_loading_progress = None  # Прогресс загрузки на момент последней отрисовки
 
         self.init_state_menu()
         self.init_state_result()
@@ -135,15 +347,43 @@ class Game:
         self.init_state_victory()
         self.init_state_game_over()
 
-        self.state = STATE_MENU
-        self.scene_index = 0
-        self.current_scene = None
         self.stats: PlayerStats
-        
         self.load_story()
+        self.reset_play_state()
+        self.resume_session()
+    
+    def reset_play_state(self):
+        """Сбрасывает изменяемое состояние партии, не трогая загруженные ресурсы."""
+        self.state = STATE_MENU
+        self.scene_index = self.story_graph.start
+        self.next_scene_index = END  # Куда ведет сделанный в сцене выбор
+        self.scenes_played = 0  # Сколько сцен пройдено в этой партии
+        self.current_scene = None
+        self.stats = PlayerStats(0, 100, 100)
+        self.fact_cursor.reset()
+        self.game_over_reason = ""
+        self.mark_dirty()
+    
+    def resume_session(self):
+        """Восстанавливает незавершенную партию из журнала, сразу переходя к ее последней сцене."""
+        entries = journal.load()
+        session = replay(self.story_scenes, self.story_graph, entries, self.stats) if entries else None
+        if session is None:
+            return
+
+        self.stats = session.stats
+        self.scene_index = session.scene_index
+        self.scenes_played = session.scenes_played
+        self.fact_cursor.shown.update(session.facts_shown)
+        if session.next_scene_index is None:
+            self.begin_state_choices()
+        else:
+            self.next_scene_index = session.next_scene_index
+            self.next_scene()
     
     def init_state_menu(self):
-        self.menu_background = create_image((50, 70, 90), WIDTH, HEIGHT)  # Темно-синий
+        self.menu_background_color = pygame.Color(50, 70, 90)  # Темно-синий
+        self.menu_background = assets.texture(self.menu_background_color, WIDTH, HEIGHT, seed=0)
         self.menu_title = Text(
             origin=(WIDTH//2, HEIGHT//4),
             font=font_large,
@@ -169,6 +409,12 @@ class Game:
             text="НАЧАТЬ ИГРУ",
             color=WHITE
         )
+        self.menu_loading_text = Text(
+            origin=(WIDTH//2, HEIGHT//2 + 80),
+            font=font_small,
+            text="",
+            color=WHITE
+        )
     
     def init_state_result(self):
         self.result_text = Text(
@@ -196,21 +442,21 @@ class Game:
     def init_state_choice(self):
         self.buttons: list[tuple[Button, Text]] = []
         self.choices = []
+        self.scene_text = Text(
+            origin=(50, 30),
+            width=WIDTH - 100,
+            font=font_small,
+            text="",
+            color=WHITE,
+            should_center=False
+        )
+        self.status_bar = StatusBar(self)
     
     def init_state_history(self):
-        self.history_facts_background = create_image((70, 70, 90), WIDTH, HEIGHT)
-
-        self.history_facts = [
-            "Блокада Ленинграда длилась 872 дня - с 8 сентября 1941 года по 27 января 1944 года.",
-            "Дорога жизни - ледовая трасса через Ладожское озеро. Зимой 1941-1942 по ней доставляли до 2000 тонн грузов ежедневно.",
-            "Норма хлеба в ноябре 1941 года: 250 грамм для рабочих, 125 грамм для остальных. Люди умирали от голода на улицах.",
-            "За время блокады по Дороге жизни эвакуировали более 1,3 млн человек, в основном женщин и детей.",
-            "Температура зимой 1941-1942 опускалась до -32°C. Водители работали по 12-16 часов без отопления в кабинах.",
-            "Всего по Дороге жизни в Ленинград доставили более 1,6 млн тонн грузов, что спасло жизни сотен тысяч людей.",
-            "Каждый третий рейс заканчивался потерей грузовика - он либо проваливался под лёд, либо уничтожался авиацией.",
-            "18 января 1943 года блокада была прорвана в ходе операции 'Искра', но полное освобождение наступило лишь год спустя."
-        ]
-        self.history_facts_shown = []
+        self.history_facts_background_color = pygame.Color(70, 70, 90)
+        self.history_facts_background = assets.texture(self.history_facts_background_color, WIDTH, HEIGHT, seed=0)
+
+        self.fact_cursor = FactCursor(fact_store)
 
         self.history_title = Text(
             origin=(WIDTH//2, 50),
@@ -274,20 +520,89 @@ class Game:
         )
     
     def load_story(self):
-        self.story_scenes = get_scenes(WIDTH, HEIGHT)
+        self.story_scenes = get_scenes()
+        self.story_graph = graph_of(self.story_scenes)
+        self.prefetch_scenes(self.story_graph.start)
+
+    def prefetch_scenes(self, scene_index: int):
+        """Начинает загрузку фонов сцен, до которых можно дойти из `scene_index` за `PREFETCH_DEPTH` переходов."""
+        for index in self.story_graph.within(scene_index, PREFETCH_DEPTH):
+            self.scene_background(self.story_scenes[index])
+    
+    def scene_background(self, scene: Scene | None) -> Asset | None:
+        """Возвращает фон сцены, подогнанный под размер экрана."""
+        if scene is None:
+            return None
+        return assets.resolve(scene.background, (WIDTH, HEIGHT))
 
     def run(self):
         while self.is_running:
-            self.handle_player_input()
+            profiler.begin_frame()
+            with profiler.section("handle_player_input"):
+                self.handle_player_input()
+            if not EVENT_DRIVEN_REDRAW:
+                self.mark_dirty()
+            self.check_stats_changed()
+            self.check_loading_progress()
+            audio.update()
+            if profiler.overlay_due():
+                profiler.update_overlay(STATE_NAMES[self.state], MAX_FPS, fonts.get(font_small))
+                self.mark_dirty(profiler.overlay_rect)
             self.draw()
+            if "fonts" not in profiler.startup:
+                # Шрифты создаются при отрисовке первого кадра
+                self.record_font_startup()
+            profiler.end_frame(STATE_NAMES[self.state])
+    
+    def record_font_startup(self):
+        """Записывает в профилировщик время поиска и загрузки шрифтов."""
+        profiler.record_startup("fonts", (fonts.resolve_time + fonts.load_time) * 1000)
+        if profiler.enabled:
+            print(fonts.report())
+    
+    def mark_dirty(self, rect: pygame.Rect | None = None):
+        """Помечает область экрана для перерисовки (без области - весь экран)."""
+        if rect is None:
+            self.redraw_all = True
+        else:
+            self.dirty_rects.append(pygame.Rect(rect))
+    
+    def is_dirty(self) -> bool:
+        return self.redraw_all or bool(self.dirty_rects)
+    
+    def check_stats_changed(self):
+        """Помечает панель параметров для перерисовки, если параметры игрока изменились."""
+        if self.state not in (STATE_CHOICE, STATE_RESULT):
+            return
+        current_stats = dataclasses.astuple(self.stats)
+        if current_stats != self.drawn_stats:
+            self.mark_dirty(STATUS_BAR_RECT)
+    
+    def check_loading_progress(self):
+        """Перерисовывает экран, когда загрузился очередной фон."""
+        progress = assets.progress()
+        if progress != self.drawn_loading_progress:
+            self.drawn_loading_progress = progress
+            self.mark_dirty()
     
     def handle_player_input(self):
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
+        events = pygame.event.get()
+        if EVENT_DRIVEN_REDRAW and not events and not self.is_dirty():
+            # Ничего не происходит - спим до следующего события
+            with profiler.section(IDLE_SECTION):
+                events = [pygame.event.wait(IDLE_WAIT_MS)] + pygame.event.get()
+        
+        for event in events:
+            if event.type in (pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.VIDEOEXPOSE):
+                self.mark_dirty()
+            elif event.type == pygame.QUIT:
                 self.is_running = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.is_running = False
+                elif event.key == pygame.K_F3:
+                    profiler.toggle()
+                    self.mark_dirty()
                 elif event.key == pygame.K_r and self.state == STATE_GAME_OVER:
                     self.reset_game()
                 elif event.key == pygame.K_r and self.state == STATE_VICTORY:
@@ -297,21 +612,45 @@ class Game:
                     self.handle_click(event.pos)
 
     def draw(self):
+        if not self.is_dirty():
+            return
+        
+        # При частичной перерисовке рисуем только внутри грязных областей
+        if not self.redraw_all:
+            screen.set_clip(self.dirty_rects[0].unionall(self.dirty_rects[1:]))
+        
         if self.state == STATE_MENU:
-            self.draw_menu()
+            draw_state = self.draw_menu
         elif self.state == STATE_CHOICE:
-            self.draw_game()
+            draw_state = self.draw_game
         elif self.state == STATE_RESULT:
-            self.draw_result()
+            draw_state = self.draw_result
         elif self.state == STATE_HISTORY:
-            self.draw_history_fact()
+            draw_state = self.draw_history_fact
         elif self.state == STATE_GAME_OVER:
-            self.draw_game_over()
+            draw_state = self.draw_game_over
         elif self.state == STATE_VICTORY:
-            self.draw_victory()
-        
-        pygame.display.flip()
-        self.fps_clock.tick(MAX_FPS)
+            draw_state = self.draw_victory
+        with profiler.section(draw_state.__name__):
+            draw_state()
+        if profiler.enabled:
+            profiler.draw_overlay(screen)
+        
+        screen.set_clip(None)
+        with profiler.section("display_flip"):
+            if self.redraw_all:
+                pygame.display.flip()
+            else:
+                pygame.display.update(self.dirty_rects)
+        profiler.mark_presented()
+        
+        if self.state in (STATE_CHOICE, STATE_RESULT):
+            self.drawn_stats = dataclasses.astuple(self.stats)
+        self.redraw_all = False
+        self.dirty_rects = []
+        # Ожидание следующего кадра не входит во время кадра
+        with profiler.section(IDLE_SECTION):
+            self.fps_clock.tick(MAX_FPS)
     
     def handle_click(self, pos):
         if self.state == STATE_MENU:
@@ -338,17 +677,24 @@ class Game:
     
     def start_game(self):
         self.stats = PlayerStats(0, 100, 100)
-        self.scene_index = 0
-        self.history_facts_shown = []
+        self.scene_index = self.story_graph.start
+        self.scenes_played = 0
+        self.fact_cursor.reset()
+        journal.start_session()
         self.begin_state_choices()
     
     def begin_result_with_text(self, text: str):
         self.result_text.text = text
         self.state = STATE_RESULT
+        self.mark_dirty()
     
     def begin_state_choices(self):
         self.state = STATE_CHOICE
+        self.mark_dirty()
         self.current_scene = self.story_scenes[self.scene_index]
+        self.prefetch_scenes(self.scene_index)
+        audio.play(self.current_scene.sound)
+        self.scene_text.text = self.current_scene.text
         self.choices = self.current_scene.choices
         self.buttons = []
         
@@ -369,204 +715,122 @@ class Game:
             self.buttons.append((button, text))
     
     def begin_victory(self):
+        journal.end_session("victory")
+        audio.fade_out()
         self.state = STATE_VICTORY
+        self.mark_dirty()
     
     def begin_state_game_over(self):
         self.game_over_subtile.text = self.game_over_reason + '\n' + "Нажмите R для перезапуска"
+        journal.end_session("game_over")
+        audio.fade_out()
         self.state = STATE_GAME_OVER
+        self.mark_dirty()
     
     # def show_history_fact(self):
     def begin_state_history(self):
-        available_facts = [f for f in self.history_facts if f not in self.history_facts_shown]
-        if not available_facts:
-            available_facts = [f for f in self.history_facts]
-            self.history_facts_shown = []
-        
-        current_history_fact = random.choice(available_facts)
-        self.history_facts_shown.append(current_history_fact)
-        self.history_fact_text.text = current_history_fact
+        fact = self.fact_cursor.next(self.current_scene.date, self.rng)
+        if fact is not None:
+            journal.record({"type": "fact", "fact": fact.fact_id})
+        self.history_fact_text.text = fact.text if fact is not None else ""
         self.state = STATE_HISTORY
+        self.mark_dirty()
     
     def process_choice(self, choice_index):
-        text = self.choices[choice_index].consequence.apply_consequences(self.stats)
+        # Броски записываются в журнал, чтобы партию можно было повторить
+        rng = RecordingRandom(self.rng)
+        text = self.choices[choice_index].consequence.apply_consequences(self.stats, rng)
+        journal.record({"type": "choice", "scene": self.scene_index, "choice": choice_index, "rolls": rng.values})
+        self.next_scene_index = self.story_graph.successors[self.scene_index][choice_index]
+        # Звук следующей сцены декодируется, пока игрок читает результат и справку
+        if self.next_scene_index != END:
+            audio.preload(self.story_scenes[self.next_scene_index].sound)
         self.begin_result_with_text(text)
     
     def next_scene(self):
-        self.scene_index += 1
-        
-        if self.scene_index >= len(self.story_scenes):
+        if self.next_scene_index == END:
             self.begin_victory()
         else:
+            self.scene_index = self.next_scene_index
+            self.scenes_played += 1
             self.begin_state_choices()
     
     def check_game_failed(self) -> bool:
-        if self.stats.food <= 0:
-            self.game_over_reason = "Весь груз еды был утерян..."
+        reason = game_failure_reason(self.stats)
+        if reason is not None:
+            self.game_over_reason = reason
             return True
-        elif self.stats.health <= 0:
-            self.game_over_reason = "Ваше здоровье ухудшилось слишком сильно..."
-            return True
-        elif self.stats.morale <= 0:
-            self.game_over_reason = "Вы потеряли волю к продолжению..."
-            return True
-        # elif self.ice_stability <= 0:
-        #     self.begin_state_game_over("Лёд стал слишком опасным для движения...")
-        
         return False
     
-    def draw_menu(self):
-        screen.blit(self.menu_background, (0, 0))
+    def build_menu_layer(self, surface: pygame.Surface):
+        blit_background(surface, self.menu_background, self.menu_background_color)
+        blit_overlay(surface, surface.get_rect(), 150)
+        
+        self.menu_title.draw(surface)
+        self.menu_subtile.draw(surface)
+        self.menu_button_begin.draw(surface)
+        self.menu_button_begin_text.draw(surface)
+    
+    def build_scene_background(self, surface: pygame.Surface):
+        blit_background(surface, self.scene_background(self.current_scene), GRAY)
         
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 150))
-        screen.blit(overlay, (0, 0))
+        blit_overlay(surface, pygame.Rect(20, 20, WIDTH - 40, HEIGHT//3), 180)
+    
+    def build_game_layer(self, surface: pygame.Surface):
+        self.build_scene_background(surface)
         
-        self.menu_title.draw()
-        self.menu_subtile.draw()
-        self.menu_button_begin.draw()
-        self.menu_button_begin_text.draw()
+        if self.current_scene:
+            self.scene_text.draw(surface)
     
-    def draw_game(self):
-        if self.current_scene.background:
-            screen.blit(self.current_scene.background, (0, 0))
-        else:
-            screen.fill(GRAY)
+    def build_result_layer(self, surface: pygame.Surface):
+        self.build_scene_background(surface)
         
-        text_bg = pygame.Surface((WIDTH - 40, HEIGHT//3), pygame.SRCALPHA)
-        text_bg.fill((0, 0, 0, 180))
-        screen.blit(text_bg, (20, 20))
+        self.result_button_next.draw(surface)
+        self.result_button_next_text.draw(surface)
+    
+    def build_history_layer(self, surface: pygame.Surface):
+        blit_background(surface, self.history_facts_background, self.history_facts_background_color)
+        blit_overlay(surface, surface.get_rect(), 180)
         
-        if self.current_scene:
-            Text(
-                origin=(50, 30),
-                width=WIDTH - 100,
-                font=font_small,
-                text=self.current_scene.text,
-                color=WHITE,
-                should_center=False
-            ).draw()
+        self.history_title.draw(surface)
+        self.history_fact_button_next.draw(surface)
+        self.history_fact_button_next_text.draw(surface)
+    
+    def draw_menu(self):
+        layer_key = (STATE_MENU, self.menu_background.is_ready())
+        screen.blit(self.layers.get(layer_key, self.build_menu_layer), (0, 0))
         
-        self.draw_status_bar()
+        done, total = assets.progress()
+        if done < total:
+            self.menu_loading_text.text = f"Загрузка: {done}/{total}"
+            self.menu_loading_text.draw()
+    
+    def draw_game(self):
+        layer_key = (STATE_CHOICE, self.scene_index, self.scene_background(self.current_scene).is_ready())
+        screen.blit(self.layers.get(layer_key, self.build_game_layer), (0, 0))
         
+        self.draw_status_bar()
+        # Кнопки рисуются поверх панели параметров: на низком экране они заходят на нее
         for button, text in self.buttons:
             button.draw()
             text.draw()
     
     def draw_result(self):
-        if self.current_scene and self.current_scene.background:
-            screen.blit(self.current_scene.background, (0, 0))
-        else:
-            screen.fill(GRAY)
-        
-        text_bg = pygame.Surface((WIDTH - 40, HEIGHT//3), pygame.SRCALPHA)
-        text_bg.fill((0, 0, 0, 180))
-        screen.blit(text_bg, (20, 20))
+        layer_key = (STATE_RESULT, self.scene_index, self.scene_background(self.current_scene).is_ready())
+        screen.blit(self.layers.get(layer_key, self.build_result_layer), (0, 0))
 
         self.draw_status_bar()
         self.result_text.draw()
-        self.result_button_next.draw()
-        self.result_button_next_text.draw()
     
     def draw_status_bar(self):
-        pygame.draw.rect(screen, BLACK, (0, HEIGHT - 80, WIDTH, 80))
-        
-        # Адаптивные размеры для полосок
-        bar_width = WIDTH // 6
-        bar_height = 15
-        bar_y = HEIGHT - 40
-        
-        Text(
-            origin=(20, HEIGHT - 70),
-            text=f"Этап: {self.scene_index+1}/{len(self.story_scenes)}",
-            font=font_small,
-            color=WHITE,
-            should_center=False
-        ).draw()
-
-        food_x = bar_width
-        Text(
-            origin=(food_x, HEIGHT - 70),
-            text=f"Продовольствие: {self.stats.food} кг",
-            font=font_small,
-            color=WHITE,
-            should_center=False
-        ).draw()
-        pygame.draw.rect(screen, GRAY, (food_x, bar_y, bar_width - 20, bar_height))
-        food_value = min(1.0, self.stats.food / 250)  # Ограничение до 100%
-        pygame.draw.rect(screen, GOLD, (food_x, bar_y, (bar_width - 20) * food_value, bar_height))
-        
-        health_x = bar_width * 2
-        Text(
-            origin=(health_x, HEIGHT - 70),
-            text=f"Здоровье: {self.stats.health}%",
-            font=font_small,
-            color=WHITE,
-            should_center=False
-        ).draw()
-        pygame.draw.rect(screen, GRAY, (health_x, bar_y, bar_width - 20, bar_height))
-        
-        # Цвет здоровья зависит от уровня
-        if self.stats.health > 50:
-            health_color = GREEN
-        elif self.stats.health > 25:
-            health_color = (255, 165, 0)  # оранжевый
-        else:
-            health_color = RED
-            
-        health_value = self.stats.health / 100
-        pygame.draw.rect(screen, health_color, (health_x, bar_y, (bar_width - 20) * health_value, bar_height))
-        
-        morale_x = bar_width * 3
-        Text(
-            origin=(morale_x, HEIGHT - 70),
-            text=f"Боевой дух: {self.stats.morale}%",
-            font=font_small,
-            color=WHITE,
-            should_center=False
-        ).draw()
-        pygame.draw.rect(screen, GRAY, (morale_x, bar_y, bar_width - 20, bar_height))
-        
-        # Цвет морали зависит от уровня
-        if self.stats.morale > 60:
-            morale_color = BLUE
-        elif self.stats.morale > 30:
-            morale_color = (100, 100, 255)  # светлосиний
-        else:
-            morale_color = (150, 150, 255)  # бледно-синий
-            
-        morale_value = self.stats.morale / 100
-        pygame.draw.rect(screen, morale_color, (morale_x, bar_y, (bar_width - 20) * morale_value, bar_height))
-        
-        # Дополнительная информация
-        delivered_x = bar_width * 4
-        Text(
-            origin=(delivered_x, HEIGHT - 70),
-            text=f"Доставлено: {self.stats.total_delivered} кг",
-            font=font_small,
-            color=WHITE,
-            should_center=False
-        ).draw()
-        
-        evacuated_x = bar_width * 5
-        Text(
-            origin=(evacuated_x, HEIGHT - 70),
-            text=f"Эвак-но: {self.stats.evacuated} ч.",
-            font=font_small,
-            color=WHITE,
-            should_center=False
-        ).draw()
+        with profiler.section("draw_status_bar"):
+            self.status_bar.draw()
     
     def draw_history_fact(self):
-        screen.blit(self.history_facts_background, (0, 0))
-        
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))
-        screen.blit(overlay, (0, 0))
+        layer_key = (STATE_HISTORY, self.history_facts_background.is_ready())
+        screen.blit(self.layers.get(layer_key, self.build_history_layer), (0, 0))
         
-        self.history_title.draw()
         self.history_fact_text.draw()
-        self.history_fact_button_next.draw()
-        self.history_fact_button_next_text.draw()
     
     def draw_game_over(self):
         screen.fill(BLACK)
@@ -585,10 +849,7 @@ class Game:
         ).draw()
         
         # Расчет результатов
-        survival_bonus = min(100, self.stats.health + self.stats.morale)
-        food_score = min(100, self.stats.total_delivered // 20)
-        evacuation_score = min(100, self.stats.evacuated * 10)
-        total_score = (survival_bonus + food_score + evacuation_score) // 3
+        total_score = victory_score(self.stats)
         
         # Описание результата
         result_desc = (
@@ -615,11 +876,18 @@ class Game:
         ).draw()
     
     def reset_game(self):
-        self.__init__()
+        self.reset_play_state()
 
 def main():
     game = Game()
-    game.run()
+    try:
+        game.run()
+    finally:
+        profiler.dump_summary(PROFILE_SUMMARY_PATH)
+        journal.close()
+        fact_store.close()
+        audio.shutdown()
+        assets.shutdown(wait=False)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""Журнал партии.
+
+Каждый выбор игрока записывается в файл вместе с результатами бросков генератора,
+поэтому после сбоя или перезапуска партию можно восстановить: выборы заново
+применяются к параметрам игрока без отрисовки промежуточных экранов.
+
+Журнал - файл JSON Lines, в который записи только дописываются:
+
+    {"type": "start"}                                       начало партии
+    {"type": "choice", "scene": 3, "choice": 1, "rolls": [0.42]}
+    {"type": "fact", "fact": 5}                             показанная справка (номер в базе справок)
+    {"type": "end", "result": "victory"}                    конец партии
+
+Запись и `fsync` делаются фоновым потоком пачками, основной поток только кладет
+запись в очередь.
+"""
+import os
+import json
+import queue
+import random
+import dataclasses
+import threading
+import time
+from collections.abc import Sequence
+from story import PlayerStats, Scene, game_failure_reason
+from story_graph import END, StoryGraph
+
+# Файл журнала (пустая строка в GAME_JOURNAL отключает журнал)
+JOURNAL_PATH = os.environ.get("GAME_JOURNAL", os.path.join(os.path.dirname(os.path.abspath(__file__)), "session.journal"))
+# Как долго копятся записи перед записью на диск (с)
+FLUSH_INTERVAL = 0.5
+
+# Команды фоновому потоку
+_TRUNCATE = object()
+_STOP = object()
+
+
+class RecordingRandom:
+    """Этот класс описывает генератор, запоминающий выданные случайные числа."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        """Настоящий генератор."""
+        self.values: list[float] = []
+        """Выданные числа."""
+
+    def random(self) -> float:
+        value = self.rng.random()
+        self.values.append(value)
+        return value
+
+
+class ReplayRandom:
+    """Этот класс описывает генератор, повторяющий записанные случайные числа."""
+
+    def __init__(self, values: list[float]):
+        self.values = iter(values)
+        """Записанные числа."""
+
+    def random(self) -> float:
+        return next(self.values)
+
+
+class Journal:
+    """Этот класс записывает журнал партии в файл в фоновом потоке.
+
+    Без `path` журнал отключен: записи никуда не пишутся, а `load` ничего не находит."""
+
+    def __init__(self, path: str | None = JOURNAL_PATH, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        """Путь к файлу журнала."""
+        self.flush_interval = flush_interval
+        """Как долго копятся записи перед записью на диск."""
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        """Записи, ожидающие записи на диск."""
+        self.thread: threading.Thread | None = None
+
+    def record(self, entry: dict):
+        """Добавляет запись в журнал (на диск она попадет в течение `flush_interval`)."""
+        if self.path is None:
+            return
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._write_loop, name="journal-writer", daemon=True)
+            self.thread.start()
+        self.queue.put(entry)
+
+    def start_session(self):
+        """Начинает новую партию: предыдущие завершенные партии из файла удаляются."""
+        self.record(_TRUNCATE)
+        self.record({"type": "start"})
+
+    def end_session(self, result: str):
+        """Отмечает конец партии - после перезапуска ее не нужно восстанавливать."""
+        self.record({"type": "end", "result": result})
+
+    def close(self):
+        """Записывает оставшиеся записи на диск и останавливает фоновый поток."""
+        if self.thread is not None:
+            self.queue.put(_STOP)
+            self.thread.join()
+            self.thread = None
+
+    def _write_loop(self):
+        with open(self.path, "a", encoding="utf-8") as file:
+            while True:
+                batch = [self.queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+                while batch[-1] is not _STOP:
+                    try:
+                        batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+
+                for entry in batch:
+                    if entry is _TRUNCATE:
+                        file.flush()
+                        file.truncate(0)
+                    elif entry is not _STOP:
+                        file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                try:
+                    file.flush()
+                    os.fsync(file.fileno())
+                except OSError:
+                    # Журнал - только страховка, игра без него работает как раньше
+                    pass
+                if batch[-1] is _STOP:
+                    return
+
+    def load(self) -> list[dict] | None:
+        """Возвращает записи незавершенной партии или `None`, если восстанавливать нечего."""
+        if self.path is None:
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                lines = file.read().splitlines()
+        except OSError:
+            return None
+
+        entries = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Последняя строка могла не дописаться при сбое
+                break
+            if entry.get("type") == "start":
+                entries = []
+            entries.append(entry)
+        if not entries or entries[0].get("type") != "start" or entries[-1].get("type") == "end":
+            return None
+        return entries
+
+
+@dataclasses.dataclass
+class ReplayedSession:
+    """Этот класс описывает состояние партии, восстановленное по журналу."""
+    stats: PlayerStats
+    """Параметры игрока."""
+    scene_index: int
+    """Сцена, в которой сделан последний выбор (или первая сцена)."""
+    next_scene_index: int | None
+    """Куда ведет последний выбор (`None` - выборов еще не было)."""
+    scenes_played: int
+    """Сколько сцен пройдено до `scene_index`."""
+    facts_shown: list[int]
+    """Номера показанных справок в базе справок."""
+
+
+def replay(scenes: Sequence[Scene], graph: StoryGraph, entries: list[dict],
+           initial_stats: PlayerStats) -> ReplayedSession | None:
+    """Повторяет записанные выборы партии, применяя последствия с записанными бросками.
+
+    Возвращает `None`, если журнал не подходит к сюжету или партия уже проиграна."""
+    session = ReplayedSession(stats=dataclasses.replace(initial_stats), scene_index=graph.start,
+                              next_scene_index=None, scenes_played=0, facts_shown=[])
+    for entry in entries:
+        if entry["type"] == "fact":
+            session.facts_shown.append(entry["fact"])
+        elif entry["type"] == "choice":
+            if session.next_scene_index is not None:
+                if session.next_scene_index == END:
+                    return None
+                session.scene_index = session.next_scene_index
+                session.scenes_played += 1
+            scene_index, choice_index = entry["scene"], entry["choice"]
+            if scene_index != session.scene_index or not 0 <= choice_index < len(scenes[scene_index].choices):
+                return None
+            try:
+                consequence = scenes[scene_index].choices[choice_index].consequence
+                consequence.apply_consequences(session.stats, ReplayRandom(entry["rolls"]))
+            except StopIteration:
+                return None
+            session.next_scene_index = graph.successors[scene_index][choice_index]
+
+    if game_failure_reason(session.stats) is not None:
+        return None
+    return session
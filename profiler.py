@@ -0,0 +1,228 @@
+"""Профилировщик кадров.
+
+Замеряет время обработки ввода, каждой функции отрисовки и вывода кадра на экран,
+собирает гистограммы времени по состояниям игры и показывает поверх экрана
+p50/p95/p99 и достигнутую частоту кадров. При выходе сохраняет сводку в JSON.
+
+Включается переменной окружения GAME_PROFILER=1 или клавишей F3 во время игры.
+Пока профилировщик выключен, `section` возвращает пустой контекст и почти ничего не стоит.
+"""
+import os
+import json
+import time
+import bisect
+import contextlib
+import pygame
+from collections import deque
+
+PROFILER_ENABLED = os.environ.get("GAME_PROFILER", "0") != "0"
+# Куда сохраняется сводка при выходе
+PROFILE_SUMMARY_PATH = os.environ.get("GAME_PROFILE_SUMMARY",
+                                      os.path.join(os.path.dirname(os.path.abspath(__file__)), "profile_summary.json"))
+# Сколько последних замеров учитывается в скользящих процентилях
+WINDOW_SIZE = 300
+# Как часто обновляется текст на экране (с)
+OVERLAY_REFRESH = 0.5
+# Имя участка ожидания событий - он не входит во время кадра
+IDLE_SECTION = "idle"
+# Границы корзин гистограммы за всю игру (мс): от 0.05 до ~2 с с шагом 25%
+BUCKET_EDGES = [0.05 * 1.25 ** index for index in range(48)]
+
+_NO_SECTION = contextlib.nullcontext()
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Возвращает процентиль отсортированных значений (ближайший ранг)."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class TimingHistogram:
+    """Этот класс хранит замеры времени одного участка кода.
+
+    Последние `WINDOW_SIZE` замеров хранятся как есть (для скользящих процентилей),
+    а все замеры за игру - в логарифмических корзинах."""
+
+    def __init__(self, window_size: int = WINDOW_SIZE):
+        self.window: deque[float] = deque(maxlen=window_size)
+        """Последние замеры (мс)."""
+        self.buckets = [0] * (len(BUCKET_EDGES) + 1)
+        """Количество замеров в каждой корзине."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, milliseconds: float):
+        self.window.append(milliseconds)
+        self.buckets[bisect.bisect_left(BUCKET_EDGES, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+
+    def recent_percentiles(self) -> tuple[float, float, float]:
+        """Возвращает p50, p95 и p99 последних замеров."""
+        values = sorted(self.window)
+        return percentile(values, 0.5), percentile(values, 0.95), percentile(values, 0.99)
+
+    def bucket_percentile(self, fraction: float) -> float:
+        """Возвращает оценку процентиля за всю игру (верхнюю границу корзины)."""
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min(BUCKET_EDGES[index], self.max) if index < len(BUCKET_EDGES) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.bucket_percentile(0.5),
+            "p95_ms": self.bucket_percentile(0.95),
+            "p99_ms": self.bucket_percentile(0.99),
+            "max_ms": self.max,
+        }
+
+
+class Section:
+    """Этот класс описывает замер одного участка кода внутри кадра."""
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.profiler.stack.append(0.0)
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        children = self.profiler.stack.pop()
+        if self.profiler.stack:
+            self.profiler.stack[-1] += elapsed
+        # Во время участка не входит время вложенных участков
+        self.profiler.frame_samples.append((self.name, (elapsed - children) * 1000))
+
+
+class Profiler:
+    """Этот класс собирает время участков кода по кадрам и состояниям игры."""
+
+    def __init__(self, enabled: bool = PROFILER_ENABLED):
+        self.enabled = enabled
+        """Идет ли сбор замеров (и показывается ли он на экране)."""
+        self.histograms: dict[str, dict[str, TimingHistogram]] = {}
+        """Гистограммы по состоянию и имени участка; участок "frame" - весь кадр."""
+        self.stack: list[float] = []
+        """Время вложенных участков для каждого открытого участка."""
+        self.frame_samples: list[tuple[str, float]] = []
+        """Замеры текущего кадра."""
+        self.frame_start = 0.0
+        self.presented = False
+        self.present_times: deque[float] = deque(maxlen=1000)
+        """Моменты вывода последних кадров (для частоты кадров)."""
+        self.overlay_rect = pygame.Rect(0, 0, 0, 0)
+        """Область экрана, занятая статистикой."""
+        self.overlay_lines: list[pygame.Surface] = []
+        """Отрисованные строки статистики."""
+        self.overlay_updated = 0.0
+        self.startup: dict[str, float] = {}
+        """Время этапов запуска игры (мс); записывается всегда, даже когда профилировщик выключен."""
+
+    def record_startup(self, name: str, milliseconds: float):
+        """Запоминает время этапа запуска игры."""
+        self.startup[name] = milliseconds
+
+    def toggle(self):
+        """Включает или выключает сбор замеров и статистику на экране."""
+        self.enabled = not self.enabled
+        self.overlay_updated = 0.0
+
+    def section(self, name: str):
+        """Возвращает контекст, замеряющий участок кода `name`."""
+        if not self.enabled:
+            return _NO_SECTION
+        return Section(self, name)
+
+    def begin_frame(self):
+        self.frame_samples = []
+        self.stack = []
+        self.presented = False
+        self.frame_start = time.perf_counter()
+
+    def mark_presented(self):
+        """Отмечает, что в этом кадре изображение выведено на экран."""
+        self.presented = True
+
+    def end_frame(self, state: str):
+        """Заканчивает кадр и записывает его замеры в гистограммы состояния `state`.
+
+        Кадры без вывода на экран (простой) в гистограмму кадров не попадают."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        histograms = self.histograms.setdefault(state, {})
+        idle = 0.0
+        for name, milliseconds in self.frame_samples:
+            if name == IDLE_SECTION:
+                idle += milliseconds
+                continue
+            histograms.setdefault(name, TimingHistogram()).add(milliseconds)
+        if self.presented:
+            histograms.setdefault("frame", TimingHistogram()).add((now - self.frame_start) * 1000 - idle)
+            self.present_times.append(now)
+
+    def fps(self) -> int:
+        """Количество кадров, выведенных на экран за последнюю секунду."""
+        now = time.perf_counter()
+        return sum(1 for moment in self.present_times if now - moment < 1.0)
+
+    def overlay_due(self) -> bool:
+        """Пора ли обновить статистику на экране."""
+        return self.enabled and time.perf_counter() - self.overlay_updated >= OVERLAY_REFRESH
+
+    def update_overlay(self, state: str, max_fps: int, font: pygame.font.Font):
+        """Пересчитывает и отрисовывает строки статистики для состояния `state`.
+
+        Строки меняются постоянно, поэтому рисуются напрямую, мимо общего кэша текста."""
+        self.overlay_updated = time.perf_counter()
+        lines = [f"FPS: {self.fps():.0f}/{max_fps}   состояние: {state}   p50 / p95 / p99, мс"]
+        if self.startup:
+            lines.append("запуск: " + ", ".join(f"{name} {milliseconds:.1f} мс" for name, milliseconds in self.startup.items()))
+        for name, histogram in self.histograms.get(state, {}).items():
+            p50, p95, p99 = histogram.recent_percentiles()
+            lines.append(f"{name}: {p50:.2f} / {p95:.2f} / {p99:.2f}")
+        self.overlay_lines = [font.render(line, True, (255, 255, 0), (0, 0, 0)) for line in lines]
+        line_height = font.get_linesize()
+        width = max(line.get_width() for line in self.overlay_lines)
+        # Область растет, но не уменьшается, чтобы не оставлять на экране старые строки
+        self.overlay_rect = self.overlay_rect.union(
+            pygame.Rect(0, 0, width + 20, line_height * len(self.overlay_lines) + 20))
+
+    def draw_overlay(self, surface: pygame.Surface):
+        """Рисует статистику в левом верхнем углу экрана."""
+        if not self.overlay_lines:
+            return
+        line_height = self.overlay_lines[0].get_height()
+        surface.fill((0, 0, 0), self.overlay_rect)
+        surface.blits([(line, (10, 10 + index * line_height)) for index, line in enumerate(self.overlay_lines)],
+                      doreturn=False)
+
+    def summary(self) -> dict:
+        """Возвращает сводку по всем состояниям и участкам и время этапов запуска."""
+        return {
+            "startup_ms": self.startup,
+            "states": {
+                state: {name: histogram.summary() for name, histogram in histograms.items()}
+                for state, histograms in self.histograms.items()
+            },
+        }
+
+    def dump_summary(self, path: str = PROFILE_SUMMARY_PATH):
+        """Сохраняет сводку в файл JSON, если что-то было замерено."""
+        if not self.histograms:
+            return
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, ensure_ascii=False, indent=2)
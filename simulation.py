@@ -0,0 +1,323 @@
+"""Пакетная симуляция прохождений игры.
+
+Все прохождения обрабатываются одновременно: параметры игроков хранятся в массивах
+NumPy, а броски для `RiskBasedConsequence` делаются одним вектором на сцену.
+Сцены обходятся в топологическом порядке графа сюжета, поэтому к каждой сцене
+все прохождения, которые в нее попадают, приходят одновременно.
+
+Для многоядерных машин есть `run_sharded`: прохождения делятся между процессами,
+и каждый процесс получает свой воспроизводимый поток случайных чисел.
+
+Запуск: python simulation.py --runs 1000000 --policy random --workers 4
+"""
+import os
+import argparse
+import dataclasses
+import time
+import numpy
+from concurrent.futures import ProcessPoolExecutor
+from story import *
+from story_graph import graph_of
+from trajectory import TrajectoryStore
+
+# Порядок полей в массивах параметров (как в `PlayerStats`)
+STAT_FIELDS = ("food", "health", "morale", "total_delivered", "evacuated")
+# Причины поражения в порядке проверки `game_failure_reason`
+FAILURE_REASONS = ("food", "health", "morale")
+# Параметры игрока в начале игры
+INITIAL_STATS = PlayerStats(0, 100, 100)
+
+
+@dataclasses.dataclass
+class Histogram:
+    """Этот класс описывает гистограмму целых значений: `counts[i]` - сколько раз встретилось `offset + i`."""
+    offset: int
+    """Наименьшее значение."""
+    counts: numpy.ndarray
+    """Количество каждого значения."""
+
+    @classmethod
+    def of(cls, values: numpy.ndarray) -> "Histogram":
+        """Строит гистограмму значений."""
+        if len(values) == 0:
+            return cls(offset=0, counts=numpy.zeros(0, dtype=numpy.int64))
+        offset = int(values.min())
+        return cls(offset=offset, counts=numpy.bincount(values - offset))
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        """Возвращает сумму двух гистограмм."""
+        if len(other.counts) == 0:
+            return self
+        if len(self.counts) == 0:
+            return other
+        offset = min(self.offset, other.offset)
+        end = max(self.offset + len(self.counts), other.offset + len(other.counts))
+        counts = numpy.zeros(end - offset, dtype=numpy.int64)
+        counts[self.offset - offset:self.offset - offset + len(self.counts)] += self.counts
+        counts[other.offset - offset:other.offset - offset + len(other.counts)] += other.counts
+        return Histogram(offset=offset, counts=counts)
+
+    def as_dict(self) -> dict[int, int]:
+        """Возвращает гистограмму как словарь значение -> количество (без нулей)."""
+        return {self.offset + index: int(count) for index, count in enumerate(self.counts) if count}
+
+
+@dataclasses.dataclass
+class SimulationReport:
+    """Этот класс описывает итоги пакетной симуляции."""
+    runs: int
+    """Количество прохождений."""
+    wins: int
+    """Количество побед."""
+    scores: numpy.ndarray
+    """Распределение оценки победы: `scores[k]` - сколько побед с оценкой `k`."""
+    failures: numpy.ndarray
+    """Поражения по сценам и причинам: `failures[scene, reason]`, причины из `FAILURE_REASONS`."""
+    final_stats: dict[str, numpy.ndarray]
+    """Параметры игроков в конце прохождения (по полям `STAT_FIELDS`); пусто у объединенных отчетов."""
+    final_histograms: dict[str, Histogram]
+    """Гистограммы параметров игроков в конце прохождения (по полям `STAT_FIELDS`)."""
+    trajectories: TrajectoryStore | None = None
+    """Записанные прохождения (только при `record=True`)."""
+
+    @property
+    def win_rate(self) -> float:
+        """Доля побед."""
+        return self.wins / self.runs if self.runs else 0.0
+
+    def mean_score(self) -> float:
+        """Средняя оценка среди побед."""
+        return float(numpy.dot(self.scores, numpy.arange(len(self.scores))) / self.wins) if self.wins else 0.0
+
+    def summary(self) -> str:
+        """Возвращает текстовый отчет."""
+        lines = [
+            f"Прохождений: {self.runs}",
+            f"Побед: {self.wins} ({self.win_rate:.2%}), средняя оценка {self.mean_score():.1f}",
+        ]
+        for reason_index, reason in enumerate(FAILURE_REASONS):
+            lines.append(f"Поражений ({reason}): {int(self.failures[:, reason_index].sum())}")
+        for scene_index, row in enumerate(self.failures):
+            if row.any():
+                counts = ", ".join(f"{reason}={int(count)}" for reason, count in zip(FAILURE_REASONS, row))
+                lines.append(f"  сцена {scene_index + 1}: {counts}")
+        return "\n".join(lines)
+
+
+def random_policy(scene_index: int, scene: Scene, stats: dict[str, numpy.ndarray], rng: numpy.random.Generator):
+    """Стратегия, выбирающая вариант случайно и равновероятно."""
+    return rng.integers(0, len(scene.choices), len(stats["food"]))
+
+
+@dataclasses.dataclass
+class FixedPolicy:
+    """Стратегия, всегда выбирающая `choice_indices[scene_index]`."""
+    choice_indices: list[int]
+    """Номер варианта для каждой сцены."""
+
+    def __call__(self, scene_index: int, scene: Scene, stats: dict[str, numpy.ndarray], rng: numpy.random.Generator):
+        return numpy.full(len(stats["food"]), self.choice_indices[scene_index])
+
+
+def fixed_policy(choice_indices: list[int]) -> FixedPolicy:
+    """Возвращает стратегию, всегда выбирающую `choice_indices[scene_index]`."""
+    return FixedPolicy(list(choice_indices))
+
+
+def modifier_vector(modifier: PlayerStatsModifier) -> numpy.ndarray:
+    """Возвращает изменение параметров в порядке `STAT_FIELDS`."""
+    return numpy.array([modifier.food, modifier.health, modifier.morale, modifier.delivered, modifier.evacuated])
+
+
+def apply_modifiers(stats: dict[str, numpy.ndarray], deltas: numpy.ndarray):
+    """Применяет изменения `deltas[field, run]` к параметрам так же, как `PlayerStatsModifier.apply`."""
+    numpy.clip(stats["food"] + deltas[0], 0, MAX_FOOD, out=stats["food"])
+    numpy.clip(stats["health"] + deltas[1], 0, MAX_HEALTH, out=stats["health"])
+    numpy.clip(stats["morale"] + deltas[2], 0, MAX_MORALE, out=stats["morale"])
+    stats["total_delivered"] += deltas[3]
+    stats["evacuated"] += deltas[4]
+
+
+def scene_deltas(scene: Scene, choices: numpy.ndarray, rolls: numpy.ndarray) -> numpy.ndarray:
+    """Возвращает изменения параметров для каждого прохождения по выбранным вариантам и броскам."""
+    deltas = numpy.zeros((len(STAT_FIELDS), len(choices)), dtype=numpy.int64)
+    for choice_index, choice in enumerate(scene.choices):
+        chosen = choices == choice_index
+        if not chosen.any():
+            continue
+        consequence = choice.consequence
+        if isinstance(consequence, RiskBasedConsequence):
+            success = rolls[chosen] < consequence.risk
+            deltas[:, chosen] = numpy.where(
+                success,
+                modifier_vector(consequence.success.modifier)[:, None],
+                modifier_vector(consequence.failure.modifier)[:, None]
+            )
+        else:
+            deltas[:, chosen] = modifier_vector(consequence.modifier)[:, None]
+    return deltas
+
+
+def victory_scores(stats: dict[str, numpy.ndarray]) -> numpy.ndarray:
+    """Векторная версия `victory_score`."""
+    survival_bonus = numpy.minimum(100, stats["health"] + stats["morale"])
+    food_score = numpy.minimum(100, stats["total_delivered"] // 20)
+    evacuation_score = numpy.minimum(100, stats["evacuated"] * 10)
+    return (survival_bonus + food_score + evacuation_score) // 3
+
+
+def simulate(scenes: list[Scene], runs: int, policy=random_policy,
+             rng: numpy.random.Generator | int | None = None, record: bool = False) -> SimulationReport:
+    """Проигрывает `runs` независимых игр по сценам со стратегией `policy`.
+
+    Стратегия получает (номер сцены, сцену, параметры игроков в этой сцене, генератор)
+    и возвращает массив номеров выбранных вариантов. С `record=True` все прохождения
+    записываются в `SimulationReport.trajectories`."""
+    rng = numpy.random.default_rng(rng)
+    graph = graph_of(scenes)
+    stats = {
+        field: numpy.full(runs, getattr(INITIAL_STATS, field), dtype=numpy.int64)
+        for field in STAT_FIELDS
+    }
+    alive = numpy.ones(runs, dtype=bool)
+    # Сцена, в которой находится каждое прохождение (`END` - игра пройдена)
+    positions = numpy.full(runs, graph.start, dtype=numpy.int64)
+    failures = numpy.zeros((len(scenes), len(FAILURE_REASONS)), dtype=numpy.int64)
+    trajectories = TrajectoryStore.empty(runs, len(scenes)) if record else None
+    if record:
+        trajectories.record_stats(0, slice(None), stats)
+
+    for scene_index in graph.order:
+        playing = numpy.nonzero(alive & (positions == scene_index))[0]
+        if playing.size == 0:
+            continue
+
+        scene = scenes[scene_index]
+        current = {field: values[playing] for field, values in stats.items()}
+        choices = numpy.asarray(policy(scene_index, scene, current, rng))
+        rolls = rng.random(playing.size)
+        apply_modifiers(current, scene_deltas(scene, choices, rolls))
+        for field, values in current.items():
+            stats[field][playing] = values
+        positions[playing] = numpy.array(graph.successors[scene_index])[choices]
+        if record:
+            trajectories.record_choices(scene_index, playing, choices)
+            # В ветвящемся сюжете в сцену можно прийти разным числом шагов
+            steps = trajectories["length"][playing]
+            for step in numpy.unique(steps):
+                same_step = steps == step
+                trajectories.record_stats(int(step), playing[same_step],
+                                          {field: values[same_step] for field, values in current.items()})
+
+        # Проверка поражения в том же порядке, что и в `game_failure_reason`
+        still_playing = numpy.ones(playing.size, dtype=bool)
+        for reason_index, field in enumerate(FAILURE_REASONS):
+            failed = still_playing & (current[field] <= 0)
+            failures[scene_index, reason_index] = failed.sum()
+            still_playing &= ~failed
+        alive[playing[~still_playing]] = False
+
+    wins = int(alive.sum())
+    scores = numpy.bincount(victory_scores({field: values[alive] for field, values in stats.items()}),
+                            minlength=101)
+    return SimulationReport(runs=runs, wins=wins, scores=scores, failures=failures, final_stats=stats,
+                            final_histograms={field: Histogram.of(values) for field, values in stats.items()},
+                            trajectories=trajectories)
+
+
+def merge_reports(reports: list[SimulationReport], scene_count: int) -> SimulationReport:
+    """Объединяет отчеты нескольких симуляций (по гистограммам, без параметров отдельных прохождений).
+
+    Без отчетов возвращает пустой отчет для сюжета из `scene_count` сцен."""
+    empty = Histogram.of(numpy.zeros(0, dtype=numpy.int64))
+    final_histograms = {field: empty for field in STAT_FIELDS}
+    for report in reports:
+        final_histograms = {
+            field: histogram.merge(report.final_histograms[field])
+            for field, histogram in final_histograms.items()
+        }
+    return SimulationReport(
+        runs=sum(report.runs for report in reports),
+        wins=sum(report.wins for report in reports),
+        scores=sum((report.scores for report in reports), numpy.zeros(101, dtype=numpy.int64)),
+        failures=sum((report.failures for report in reports),
+                     numpy.zeros((scene_count, len(FAILURE_REASONS)), dtype=numpy.int64)),
+        final_stats={},
+        final_histograms=final_histograms,
+    )
+
+
+def simulate_shard(scenes: list[Scene], runs: int, policy, seed: numpy.random.SeedSequence,
+                   batch_size: int) -> SimulationReport:
+    """Проигрывает часть прохождений пачками по `batch_size` (выполняется в отдельном процессе)."""
+    rng = numpy.random.default_rng(seed)
+    reports = []
+    for start in range(0, runs, batch_size):
+        report = simulate(scenes, min(batch_size, runs - start), policy, rng)
+        report.final_stats = {}
+        reports.append(report)
+    return merge_reports(reports, len(scenes))
+
+
+def shard_sizes(runs: int, workers: int) -> list[int]:
+    """Делит прохождения между процессами как можно ровнее."""
+    return [runs // workers + (1 if worker < runs % workers else 0) for worker in range(workers)]
+
+
+def run_sharded(scenes: list[Scene], runs: int, policy=random_policy, seed: int = 0,
+                workers: int | None = None, batch_size: int = 1_000_000) -> SimulationReport:
+    """Проигрывает `runs` игр в `workers` процессах.
+
+    Поток случайных чисел каждого процесса выводится из `seed` через `numpy.random.SeedSequence`,
+    поэтому при тех же `seed` и `workers` результат совпадает бит в бит.
+    Стратегия должна передаваться между процессами (функция модуля или объект, а не замыкание)."""
+    workers = workers or os.cpu_count() or 1
+    seeds = numpy.random.SeedSequence(seed).spawn(workers)
+    # Процессы без прохождений (их меньше, чем процессов) не запускаются
+    shards = [(size, shard_seed) for size, shard_seed in zip(shard_sizes(runs, workers), seeds) if size > 0]
+    if not shards:
+        return merge_reports([], len(scenes))
+    with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+        reports = list(executor.map(
+            simulate_shard,
+            [scenes] * len(shards), [size for size, _ in shards], [policy] * len(shards),
+            [shard_seed for _, shard_seed in shards], [batch_size] * len(shards)
+        ))
+    return merge_reports(reports, len(scenes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетная симуляция прохождений игры.")
+    parser.add_argument("--runs", type=int, default=1_000_000, help="количество прохождений")
+    parser.add_argument("--seed", type=int, default=None, help="зерно генератора")
+    parser.add_argument("--policy", default="random",
+                        help="'random' или номера вариантов через запятую (с нуля), по одному на сцену")
+    parser.add_argument("--save-trajectories", help="сохранить все прохождения в папку (см. trajectory.py)")
+    parser.add_argument("--workers", type=int, default=1, help="количество процессов (см. run_sharded)")
+    args = parser.parse_args()
+
+    scenes = get_scenes()
+    if args.policy == "random":
+        policy = random_policy
+    else:
+        policy = fixed_policy([int(index) for index in args.policy.split(",")])
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        if args.save_trajectories:
+            parser.error("--save-trajectories работает только с одним процессом")
+        seed = args.seed if args.seed is not None else numpy.random.SeedSequence().entropy
+        print(f"Зерно: {seed}, процессов: {args.workers}")
+        report = run_sharded(scenes, args.runs, policy, seed, args.workers)
+    else:
+        report = simulate(scenes, args.runs, policy, args.seed, record=args.save_trajectories is not None)
+    elapsed = time.perf_counter() - start
+    print(report.summary())
+    print(f"Время: {elapsed:.2f} с ({args.runs / elapsed:,.0f} прохождений/с)")
+    if args.save_trajectories:
+        report.trajectories.save(args.save_trajectories)
+        print(f"Прохождения сохранены: {report.trajectories.nbytes() / 2 ** 20:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
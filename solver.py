@@ -0,0 +1,457 @@
+"""Точный расчет исходов игры.
+
+Последствия каждой сцены конечны, поэтому вместо случайных прохождений можно
+переносить распределение вероятностей по состояниям игрока от сцены к сцене,
+объединяя одинаковые состояния. Сцены обходятся в топологическом порядке графа
+сюжета, так что распределения всех путей в сцену сливаются до ее обработки, и
+каждое различное состояние обрабатывается на сцене ровно один раз.
+
+Запуск: python solver.py
+"""
+import argparse
+import dataclasses
+import functools
+import time
+import numpy
+from collections import defaultdict
+from story import *
+from story_graph import END, StoryGraph, graph_of
+from simulation import STAT_FIELDS, FAILURE_REASONS, INITIAL_STATS, modifier_vector, victory_scores
+
+State = tuple[int, int, int, int, int]
+"""Состояние игрока: (food, health, morale, total_delivered, evacuated)."""
+
+# Состояние в начале игры
+INITIAL_STATE: State = dataclasses.astuple(INITIAL_STATS)
+
+
+def choice_outcomes(choice: Choice) -> list[tuple[float, numpy.ndarray]]:
+    """Возвращает исходы выбора: список (вероятность, изменение параметров в порядке `STAT_FIELDS`)."""
+    consequence = choice.consequence
+    if isinstance(consequence, RiskBasedConsequence):
+        outcomes = [
+            (consequence.risk, modifier_vector(consequence.success.modifier)),
+            (1.0 - consequence.risk, modifier_vector(consequence.failure.modifier)),
+        ]
+        return [(probability, modifier) for probability, modifier in outcomes if probability > 0]
+    return [(1.0, modifier_vector(consequence.modifier))]
+
+
+def apply_modifier(states: numpy.ndarray, modifier: numpy.ndarray) -> numpy.ndarray:
+    """Возвращает состояния `states[state, field]` после изменения, как `PlayerStatsModifier.apply`."""
+    next_states = states + modifier
+    numpy.clip(next_states[:, 0], 0, MAX_FOOD, out=next_states[:, 0])
+    numpy.clip(next_states[:, 1], 0, MAX_HEALTH, out=next_states[:, 1])
+    numpy.clip(next_states[:, 2], 0, MAX_MORALE, out=next_states[:, 2])
+    return next_states
+
+
+def failure_reasons(states: numpy.ndarray) -> numpy.ndarray:
+    """Возвращает номер причины поражения из `FAILURE_REASONS` для каждого состояния (-1 - игра продолжается).
+
+    Причины проверяются в том же порядке, что и в `game_failure_reason`."""
+    reasons = numpy.full(len(states), -1)
+    for reason_index in reversed(range(len(FAILURE_REASONS))):
+        reasons[states[:, reason_index] <= 0] = reason_index
+    return reasons
+
+
+def merge_states(states: numpy.ndarray, probabilities: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """Объединяет одинаковые состояния, складывая их вероятности."""
+    # Упаковываем состояние в одно число - так сортировка в `numpy.unique` намного быстрее
+    lows = states.min(axis=0)
+    spans = states.max(axis=0) - lows + 1
+    if numpy.prod(spans.astype(float)) < 2 ** 62:
+        keys = numpy.zeros(len(states), dtype=numpy.int64)
+        for column in range(states.shape[1]):
+            keys = keys * spans[column] + (states[:, column] - lows[column])
+        _, first, inverse = numpy.unique(keys, return_index=True, return_inverse=True)
+        unique_states = states[first]
+    else:
+        unique_states, inverse = numpy.unique(states, axis=0, return_inverse=True)
+    return unique_states, numpy.bincount(inverse.ravel(), weights=probabilities, minlength=len(unique_states))
+
+
+@dataclasses.dataclass
+class OutcomeDistribution:
+    """Этот класс описывает точное распределение исходов игры при заданной стратегии."""
+    win_probability: float
+    """Вероятность победы."""
+    scores: dict[int, float]
+    """Вероятность каждой оценки победы."""
+    failures: numpy.ndarray
+    """Вероятность поражения по сценам и причинам: `failures[scene, reason]`."""
+    final_states: numpy.ndarray
+    """Различные состояния игрока при победе (строки в порядке `STAT_FIELDS`)."""
+    final_probabilities: numpy.ndarray
+    """Вероятности состояний из `final_states`."""
+    states_per_scene: list[int]
+    """Количество различных состояний после каждой сцены (по номерам сцен)."""
+
+    def summary(self) -> str:
+        """Возвращает текстовый отчет."""
+        lines = [f"Вероятность победы: {self.win_probability:.6f}"]
+        if self.win_probability:
+            mean_score = sum(score * probability for score, probability in self.scores.items())
+            lines.append(f"Средняя оценка при победе: {mean_score / self.win_probability:.2f}")
+        lines.append(f"Состояний по сценам: {self.states_per_scene}")
+        for reason_index, reason in enumerate(FAILURE_REASONS):
+            lines.append(f"Поражение ({reason}): {self.failures[:, reason_index].sum():.6f}")
+        for scene_index, row in enumerate(self.failures):
+            if row.any():
+                probabilities = ", ".join(f"{reason}={probability:.6f}" for reason, probability in zip(FAILURE_REASONS, row))
+                lines.append(f"  сцена {scene_index + 1}: {probabilities}")
+        return "\n".join(lines)
+
+
+def policy_choices(policy, scene_index: int, scene: Scene, states: numpy.ndarray) -> numpy.ndarray | None:
+    """Возвращает номер выбранного варианта для каждого состояния.
+
+    `policy` - `None` (все варианты равновероятны, тогда возвращается `None`), список
+    номеров вариантов по сценам или функция (номер сцены, сцена, состояние) -> номер варианта."""
+    if policy is None:
+        return None
+    if callable(policy):
+        return numpy.array([policy(scene_index, scene, tuple(int(value) for value in state)) for state in states],
+                           dtype=numpy.int64)
+    return numpy.full(len(states), policy[scene_index])
+
+
+def step(scene: Scene, successors: list[int], states: numpy.ndarray, probabilities: numpy.ndarray,
+         choices: numpy.ndarray | None) -> dict[int, tuple[numpy.ndarray, numpy.ndarray]]:
+    """Переносит распределение по состояниям через сцену (без проверки поражения).
+
+    Возвращает распределения по следующим сценам: номер сцены (или `END`) -> (состояния, вероятности)."""
+    next_states, next_probabilities = defaultdict(list), defaultdict(list)
+    for choice_index, (choice, target) in enumerate(zip(scene.choices, successors)):
+        if choices is None:
+            chosen = slice(None)
+            weight = 1.0 / len(scene.choices)
+        else:
+            chosen = choices == choice_index
+            weight = 1.0
+            if not chosen.any():
+                continue
+        for outcome_probability, modifier in choice_outcomes(choice):
+            next_states[target].append(apply_modifier(states[chosen], modifier))
+            next_probabilities[target].append(probabilities[chosen] * (weight * outcome_probability))
+    return {
+        target: merge_states(numpy.concatenate(next_states[target]), numpy.concatenate(next_probabilities[target]))
+        for target in next_states
+    }
+
+
+def solve_policy(scenes: Sequence[Scene], policy=None) -> OutcomeDistribution:
+    """Точно вычисляет распределение исходов игры для стратегии `policy` (см. `policy_choices`)."""
+    graph = graph_of(scenes)
+    # Распределения, пришедшие в каждую сцену (и в конец игры) разными путями
+    incoming = defaultdict(list)
+    incoming[graph.start].append((numpy.array([INITIAL_STATE], dtype=numpy.int64), numpy.ones(1)))
+    failures = numpy.zeros((len(scenes), len(FAILURE_REASONS)))
+    states_per_scene = [0] * len(scenes)
+
+    for scene_index in graph.order:
+        if scene_index not in incoming:
+            continue
+        scene = scenes[scene_index]
+        parts = incoming.pop(scene_index)
+        states, probabilities = merge_states(numpy.concatenate([part[0] for part in parts]),
+                                             numpy.concatenate([part[1] for part in parts]))
+        choices = policy_choices(policy, scene_index, scene, states)
+
+        for target, (next_states, next_probabilities) in step(scene, graph.successors[scene_index], states,
+                                                              probabilities, choices).items():
+            reasons = failure_reasons(next_states)
+            failures[scene_index] += numpy.bincount(reasons[reasons >= 0], weights=next_probabilities[reasons >= 0],
+                                                    minlength=len(FAILURE_REASONS))
+            alive = reasons < 0
+            states_per_scene[scene_index] += int(alive.sum())
+            if alive.any():
+                incoming[target].append((next_states[alive], next_probabilities[alive]))
+
+    if incoming[END]:
+        states, probabilities = merge_states(numpy.concatenate([part[0] for part in incoming[END]]),
+                                             numpy.concatenate([part[1] for part in incoming[END]]))
+    else:
+        states, probabilities = numpy.zeros((0, len(STAT_FIELDS)), dtype=numpy.int64), numpy.zeros(0)
+
+    scores: dict[int, float] = defaultdict(float)
+    state_scores = victory_scores({field: states[:, index] for index, field in enumerate(STAT_FIELDS)})
+    for score, probability in zip(state_scores.tolist(), probabilities.tolist()):
+        scores[score] += probability
+
+    return OutcomeDistribution(
+        win_probability=float(probabilities.sum()),
+        scores=dict(sorted(scores.items())),
+        failures=failures,
+        final_states=states,
+        final_probabilities=probabilities,
+        states_per_scene=states_per_scene,
+    )
+
+
+def enumerate_paths(scenes: Sequence[Scene], policy=None) -> float:
+    """Вычисляет вероятность победы перебором всех путей без объединения состояний.
+
+    Нужна только для проверки `solve_policy`: время растет экспоненциально."""
+    graph = graph_of(scenes)
+
+    def visit(scene_index: int, stats: PlayerStats) -> float:
+        if scene_index == END:
+            return 1.0
+        scene = scenes[scene_index]
+        state = numpy.array([dataclasses.astuple(stats)])
+        choices = policy_choices(policy, scene_index, scene, state)
+        win_probability = 0.0
+        for choice_index, choice in enumerate(scene.choices):
+            if choices is None:
+                weight = 1.0 / len(scene.choices)
+            elif choices[0] == choice_index:
+                weight = 1.0
+            else:
+                continue
+            consequence = choice.consequence
+            if isinstance(consequence, RiskBasedConsequence):
+                outcomes = [(consequence.risk, consequence.success), (1.0 - consequence.risk, consequence.failure)]
+            else:
+                outcomes = [(1.0, consequence)]
+            for outcome_probability, outcome in outcomes:
+                next_stats = dataclasses.replace(stats)
+                outcome.apply_consequences(next_stats)
+                if outcome_probability > 0 and game_failure_reason(next_stats) is None:
+                    win_probability += weight * outcome_probability * visit(
+                        graph.successors[scene_index][choice_index], next_stats)
+        return win_probability
+
+    return visit(graph.start, dataclasses.replace(INITIAL_STATS))
+
+
+@dataclasses.dataclass
+class StateCodec:
+    """Этот класс упаковывает состояния в числа int64 по одной схеме для всех сцен."""
+    lows: numpy.ndarray
+    """Наименьшие возможные значения полей."""
+    spans: numpy.ndarray
+    """Количество возможных значений каждого поля."""
+
+    @classmethod
+    def for_scenes(cls, scenes: Sequence[Scene]) -> "StateCodec":
+        """Возвращает схему, вмещающую все состояния, достижимые в сценах (с запасом: как если бы
+        игрок проходил все сцены подряд)."""
+        lows = numpy.array([0, 0, 0, INITIAL_STATE[3], INITIAL_STATE[4]], dtype=numpy.int64)
+        highs = numpy.array([MAX_FOOD, MAX_HEALTH, MAX_MORALE, INITIAL_STATE[3], INITIAL_STATE[4]], dtype=numpy.int64)
+        for scene in scenes:
+            modifiers = numpy.array([modifier for choice in scene.choices for _, modifier in choice_outcomes(choice)])
+            lows[3:] += numpy.minimum(0, modifiers[:, 3:].min(axis=0))
+            highs[3:] += numpy.maximum(0, modifiers[:, 3:].max(axis=0))
+        return cls(lows=lows, spans=highs - lows + 1)
+
+    def encode(self, states: numpy.ndarray) -> numpy.ndarray:
+        """Возвращает ключ каждого состояния."""
+        keys = numpy.zeros(len(states), dtype=numpy.int64)
+        for column in range(states.shape[1]):
+            keys = keys * self.spans[column] + (states[:, column] - self.lows[column])
+        return keys
+
+
+def reachable_states(scenes: Sequence[Scene], graph: StoryGraph,
+                     codec: StateCodec) -> list[tuple[numpy.ndarray, numpy.ndarray]]:
+    """Возвращает (состояния, ключи) перед каждой сценой при любых выборах (по номерам сцен).
+
+    Состояния отсортированы по ключу; проигранные состояния не включаются."""
+    incoming = defaultdict(list)
+    incoming[graph.start].append(numpy.array([INITIAL_STATE], dtype=numpy.int64))
+    empty = numpy.zeros((0, len(STAT_FIELDS)), dtype=numpy.int64)
+    result = [(empty, numpy.zeros(0, dtype=numpy.int64))] * len(scenes)
+    for scene_index in graph.order:
+        if scene_index not in incoming:
+            continue
+        states = numpy.concatenate(incoming.pop(scene_index))
+        keys, first = numpy.unique(codec.encode(states), return_index=True)
+        states = states[first]
+        result[scene_index] = (states, keys)
+
+        scene = scenes[scene_index]
+        for choice, target in zip(scene.choices, graph.successors[scene_index]):
+            if target == END:
+                continue
+            for _, modifier in choice_outcomes(choice):
+                next_states = apply_modifier(states, modifier)
+                incoming[target].append(next_states[failure_reasons(next_states) < 0])
+    return result
+
+
+@dataclasses.dataclass
+class OptimalPolicy:
+    """Этот класс описывает оптимальную стратегию как таблицу: (сцена, состояние) -> номер варианта."""
+    codec: StateCodec
+    """Схема упаковки состояний."""
+    keys: list[numpy.ndarray]
+    """Отсортированные ключи достижимых состояний перед каждой сценой (по номерам сцен)."""
+    choices: list[numpy.ndarray]
+    """Лучший вариант для каждого состояния из `keys`."""
+    values: list[numpy.ndarray]
+    """Ожидаемая награда при игре по стратегии из каждого состояния."""
+    objective: str
+    """Что максимизирует стратегия: "score" (ожидаемая оценка) или "win" (вероятность победы)."""
+    start: int = 0
+    """Номер первой сцены (`StoryGraph.start`)."""
+
+    def expected_value(self) -> float:
+        """Ожидаемая награда из начального состояния (единственного состояния перед первой сценой)."""
+        return float(self.values[self.start][0])
+
+    def lookup(self, scene_index: int, states: numpy.ndarray) -> numpy.ndarray:
+        """Возвращает лучшие варианты для состояний `states[state, field]` перед сценой."""
+        keys = self.keys[scene_index]
+        if len(keys) == 0:
+            raise KeyError(f"Перед сценой {scene_index + 1} нет достижимых состояний")
+        positions = numpy.searchsorted(keys, self.codec.encode(states))
+        positions = numpy.minimum(positions, len(keys) - 1)
+        if not numpy.array_equal(keys[positions], self.codec.encode(states)):
+            raise KeyError(f"Состояние не достижимо перед сценой {scene_index + 1}")
+        return self.choices[scene_index][positions]
+
+    def __call__(self, scene_index: int, scene: Scene, state: State) -> int:
+        """Стратегия для `solve_policy`."""
+        return int(self.lookup(scene_index, numpy.array([state], dtype=numpy.int64))[0])
+
+    def simulation_policy(self):
+        """Возвращает эту стратегию в виде, нужном `simulation.simulate` (можно передавать в другие процессы)."""
+        return functools.partial(lookup_policy, self)
+
+    def save(self, file_path: str):
+        """Сохраняет таблицу стратегии в файл `.npz`."""
+        numpy.savez_compressed(
+            file_path,
+            lows=self.codec.lows,
+            spans=self.codec.spans,
+            offsets=numpy.cumsum([0] + [len(keys) for keys in self.keys]),
+            keys=numpy.concatenate(self.keys),
+            choices=numpy.concatenate(self.choices).astype(numpy.int8),
+            values=numpy.concatenate(self.values).astype(numpy.float32),
+            objective=self.objective,
+            start=self.start,
+        )
+
+    @classmethod
+    def load(cls, file_path: str) -> "OptimalPolicy":
+        """Загружает таблицу стратегии, сохраненную `save`."""
+        with numpy.load(file_path) as data:
+            offsets = data["offsets"]
+            def split(column):
+                return [data[column][start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+            return cls(
+                codec=StateCodec(lows=data["lows"], spans=data["spans"]),
+                keys=split("keys"),
+                choices=split("choices"),
+                values=split("values"),
+                objective=str(data["objective"]),
+                # Файлы старых версий не хранят первую сцену - в них это всегда сцена 0
+                start=int(data["start"]) if "start" in data.files else 0,
+            )
+
+
+def lookup_policy(policy: OptimalPolicy, scene_index: int, scene: Scene,
+                  stats: dict[str, numpy.ndarray], rng: numpy.random.Generator) -> numpy.ndarray:
+    """Стратегия для `simulation.simulate`, берущая варианты из таблицы `policy`."""
+    states = numpy.stack([stats[field] for field in STAT_FIELDS], axis=1)
+    return policy.lookup(scene_index, states)
+
+
+def solve_optimal_policy(scenes: Sequence[Scene], objective: str = "score") -> OptimalPolicy:
+    """Вычисляет оптимальную стратегию обратной индукцией по сценам (в обратном топологическом порядке).
+
+    Награда за победу - `victory_score` (или 1 при `objective="win"`), за поражение - 0."""
+    graph = graph_of(scenes)
+    codec = StateCodec.for_scenes(scenes)
+    reachable = reachable_states(scenes, graph, codec)
+
+    def final_values(final_states: numpy.ndarray) -> numpy.ndarray:
+        if objective == "win":
+            return numpy.ones(len(final_states))
+        return victory_scores({field: final_states[:, index] for index, field in enumerate(STAT_FIELDS)}).astype(float)
+
+    choices_per_scene = [numpy.zeros(0, dtype=numpy.int64)] * len(scenes)
+    values_per_scene = [numpy.zeros(0)] * len(scenes)
+    for scene_index in reversed(graph.order):
+        scene = scenes[scene_index]
+        states, keys = reachable[scene_index]
+        if len(states) == 0:
+            continue
+
+        choice_values = numpy.zeros((len(states), len(scene.choices)))
+        for choice_index, (choice, target) in enumerate(zip(scene.choices, graph.successors[scene_index])):
+            for outcome_probability, modifier in choice_outcomes(choice):
+                next_states = apply_modifier(states, modifier)
+                alive = failure_reasons(next_states) < 0
+                if target == END:
+                    next_values = final_values(next_states)
+                else:
+                    # Все выжившие состояния есть среди достижимых перед следующей сценой
+                    next_keys = reachable[target][1]
+                    if len(next_keys) == 0:
+                        continue
+                    positions = numpy.minimum(numpy.searchsorted(next_keys, codec.encode(next_states)),
+                                              len(next_keys) - 1)
+                    next_values = values_per_scene[target][positions]
+                choice_values[:, choice_index] += outcome_probability * numpy.where(alive, next_values, 0.0)
+
+        # При равенстве выбирается вариант с меньшим номером
+        choices = choice_values.argmax(axis=1)
+        choices_per_scene[scene_index] = choices
+        values_per_scene[scene_index] = choice_values[numpy.arange(len(states)), choices]
+
+    return OptimalPolicy(
+        codec=codec,
+        keys=[keys for _, keys in reachable],
+        choices=choices_per_scene,
+        values=values_per_scene,
+        objective=objective,
+        start=graph.start,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Точный расчет исходов игры.")
+    parser.add_argument("--policy", default="uniform",
+                        help="'uniform' или номера вариантов через запятую (с нуля), по одному на сцену")
+    parser.add_argument("--compare-scenes", type=int, default=0,
+                        help="сравнить с перебором путей на первых N сценах")
+    parser.add_argument("--optimal", choices=("score", "win"),
+                        help="найти оптимальную стратегию по оценке или по вероятности победы")
+    parser.add_argument("--export", help="сохранить таблицу оптимальной стратегии в файл .npz")
+    args = parser.parse_args()
+
+    scenes = get_scenes()
+    policy = None if args.policy == "uniform" else [int(index) for index in args.policy.split(",")]
+
+    if args.optimal:
+        start = time.perf_counter()
+        policy = solve_optimal_policy(scenes, args.optimal)
+        elapsed = time.perf_counter() - start
+        states = sum(len(keys) for keys in policy.keys)
+        print(f"Оптимальная стратегия ({args.optimal}): ожидаемая награда {policy.expected_value():.4f}, "
+              f"{states} состояний, {elapsed * 1000:.1f} мс")
+        if args.export:
+            policy.save(args.export)
+
+    start = time.perf_counter()
+    result = solve_policy(scenes, policy)
+    print(result.summary())
+    print(f"Время: {(time.perf_counter() - start) * 1000:.1f} мс")
+
+    if args.compare_scenes:
+        prefix = scenes[:args.compare_scenes]
+        start = time.perf_counter()
+        exact = solve_policy(prefix, policy).win_probability
+        solve_time = time.perf_counter() - start
+        start = time.perf_counter()
+        brute_force = enumerate_paths(prefix, policy)
+        brute_force_time = time.perf_counter() - start
+        print(f"Первые {len(prefix)} сцен: {exact:.9f} за {solve_time * 1000:.1f} мс, "
+              f"перебор {brute_force:.9f} за {brute_force_time * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Сюжет игры и его правила.
+
+Этот модуль не зависит от pygame: сцены хранят ссылки на ресурсы, а не сами
+изображения, поэтому логику игры можно запускать без экрана."""
+import random
+import dataclasses
+from datetime import datetime
+from collections.abc import Sequence
+
+# Исторические даты блокады
+BLOCKADE_START = datetime(1941, 9, 8)
+BLOCKADE_END = datetime(1944, 1, 27)
+
+# Ограничение параметров
+MAX_FOOD = 250
+MAX_HEALTH = 100
+MAX_MORALE = 100
+
+# Идентификатор следующей сцены, означающий конец игры
+STORY_END = "end"
+
+@dataclasses.dataclass(slots=True)
+class PlayerStats:
+    """Этот класс описывает параметры игрока."""
+    food: int
+    """Текущее количество еды."""
+    health: int
+    """Текущее количество здоровья."""
+    morale: int
+    """Текущее количество боевого духа."""
+    total_delivered: int = 0
+    """Общее доставленное продовольствие"""
+    evacuated: int = 0
+    """Количество эвакуированных людей"""
+
+@dataclasses.dataclass(slots=True)
+class PlayerStatsModifier:
+    """Этот класс описывает изменение параметров игрока из-за внешних факторов."""
+    food: int = 0
+    """Изменение в количестве еды."""
+    health: int = 0
+    """Изменение в количестве здоровья."""
+    morale: int = 0
+    """Изменение в количестве боевого духа."""
+    delivered: int = 0
+    """Доставленное продовольствие"""
+    evacuated: int = 0
+    """Эвакуированные люди"""
+
+    def apply(self, stats: PlayerStats):
+        stats.food = max(min(self.food + stats.food, MAX_FOOD), 0)
+        stats.health = max(min(self.health + stats.health, MAX_HEALTH), 0)
+        stats.morale = max(min(self.morale + stats.morale, MAX_MORALE), 0)
+        stats.total_delivered += self.delivered
+        stats.evacuated += self.evacuated
+
+@dataclasses.dataclass
+class SimpleConsequence:
+    """Этот класс описывает последствия обычного выбора."""
+    text: str
+    """Текст, описывающий последствия выбора."""
+    modifier: PlayerStatsModifier
+    """Изменение параметров происходящее происходящее в результате выбора."""
+
+    def apply_consequences(self, stats: PlayerStats, rng: random.Random | None = None) -> str:
+        """Применяет последствия выбора к параметрам игрока. 
+        
+        Возвращает текст, описывающий последствия выбора."""
+        self.modifier.apply(stats)
+        return self.text
+
+@dataclasses.dataclass
+class RiskBasedConsequence:
+    """Этот класс описывает последствия выбора, связанного с риском."""
+    risk: float
+    """Шанс успеха в промежутке от 1 до 0."""
+    success: SimpleConsequence
+    """Последствия при успехе."""
+    failure: SimpleConsequence
+    """Последствия при провале."""
+
+    def apply_consequences(self, stats: PlayerStats, rng: random.Random | None = None) -> str:
+        """Применяет последствия выбора к параметрам игрока. 
+        
+        Бросок делается генератором `rng` (по умолчанию - общим генератором модуля `random`).
+        Возвращает текст, описывающий последствия выбора."""
+        if (rng or random).random() < self.risk:
+            return self.success.apply_consequences(stats, rng)
+        else:
+            return self.failure.apply_consequences(stats, rng)
+
+@dataclasses.dataclass(frozen=True)
+class ImageRef:
+    """Этот класс описывает ссылку на картинку из файла."""
+    path: str
+    """Путь к файлу картинки."""
+
+@dataclasses.dataclass(frozen=True)
+class SoundRef:
+    """Этот класс описывает ссылку на звук из файла."""
+    path: str
+    """Путь к файлу звука (WAV или OGG)."""
+    stream: bool | None = None
+    """Проигрывать ли звук потоком с диска (`None` - решить по размеру файла, см. `audio`)."""
+
+@dataclasses.dataclass(frozen=True)
+class TextureRef:
+    """Этот класс описывает ссылку на процедурную текстуру."""
+    base_color: tuple[int, int, int]
+    """Основной цвет текстуры."""
+    seed: int | None = None
+    """Зерно генератора; с ним текстура всегда одинаковая."""
+
+@dataclasses.dataclass
+class Choice:
+    """Этот класс описывает выбор."""
+    text: str
+    """Текст выбора."""
+    consequence: SimpleConsequence | RiskBasedConsequence
+    """Последствие выбора."""
+    next_scene: str | None = None
+    """Идентификатор сцены, в которую ведет выбор (`STORY_END` - конец игры, `None` - следующая по порядку)."""
+
+@dataclasses.dataclass
+class Scene:
+    """Этот класс описывает сцену (этап игры с выборами)."""
+    title: str
+    """Заголовок сцены"""
+    text: str
+    """Текскт описывающий сцену."""
+    background: ImageRef | TextureRef
+    """Ссылка на фоновое изображение сцены."""
+    sound: SoundRef | None
+    """Ссылка на звук, играющий при начале сцены."""
+    choices: list[Choice]
+    """Список выборов доступных в сцене."""
+    date: datetime
+    """Дата события"""
+    scene_id: str | None = None
+    """Идентификатор сцены для переходов (см. `Choice.next_scene`)."""
+
+def game_failure_reason(stats: PlayerStats) -> str | None:
+    """Проверяет, проиграна ли игра.
+
+    Возвращает причину поражения или `None`, если игра продолжается."""
+    if stats.food <= 0:
+        return "Весь груз еды был утерян..."
+    elif stats.health <= 0:
+        return "Ваше здоровье ухудшилось слишком сильно..."
+    elif stats.morale <= 0:
+        return "Вы потеряли волю к продолжению..."
+    # elif stats.ice_stability <= 0:
+    #     return "Лёд стал слишком опасным для движения..."
+    
+    return None
+
+def victory_score(stats: PlayerStats) -> int:
+    """Возвращает общую оценку подвига (от 0 до 100) для победившего игрока."""
+    survival_bonus = min(100, stats.health + stats.morale)
+    food_score = min(100, stats.total_delivered // 20)
+    evacuation_score = min(100, stats.evacuated * 10)
+    return (survival_bonus + food_score + evacuation_score) // 3
+
+def get_scenes() -> Sequence[Scene]:
+    """Возвращает сцены игры из файла сюжета `story.json` (см. `story_compiler`)."""
+    from story_compiler import load_story
+    return load_story()
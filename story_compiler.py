@@ -0,0 +1,361 @@
+"""Компилятор сюжета.
+
+Сюжет описывается в файле JSON (`story.json`): сцены, выборы, изменения параметров,
+риски, даты и ссылки на ресурсы (звук сцены - имя файла или `{"file": ..., "stream": true}`
+для длинных дорожек, см. `audio`). Компилятор проверяет его и сохраняет в индексированный
+двоичный формат:
+
+    заголовок   MAGIC, версия (u32), количество сцен (u32)
+    индекс      смещения записей (u64, количество сцен + 2)
+    записи      каждая сцена - отдельная запись JSON в UTF-8
+    граф        таблица переходов между сценами (запись JSON, см. `story_graph`)
+
+Во время игры файл отображается в память, а сцена разбирается только при первом
+обращении к ней, поэтому загрузка не зависит от размера сюжета. Граф переходов
+читается без разбора сцен.
+
+Запуск: python story_compiler.py story.json story.bin
+"""
+import os
+import sys
+import mmap
+import json
+import struct
+from datetime import datetime
+from collections.abc import Sequence
+from story import *
+from story_graph import StoryGraph, resolve_successors, topological_order
+
+MAGIC = b"RLSTORY\0"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sII")
+OFFSET = struct.Struct("<Q")
+
+STORY_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOURCE = os.path.join(STORY_DIR, "story.json")
+DEFAULT_COMPILED = os.path.join(STORY_DIR, "story.bin")
+
+MODIFIER_FIELDS = ("food", "health", "morale", "delivered", "evacuated")
+
+
+class StoryError(ValueError):
+    """Ошибка в файле сюжета. `errors` - список всех найденных проблем."""
+
+    def __init__(self, errors: list[str]):
+        super().__init__("Story validation failed:\n" + "\n".join(f"  - {error}" for error in errors))
+        self.errors = errors
+
+
+def parse_date(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def validate_consequence(consequence: dict, where: str, errors: list[str]):
+    if "risk" in consequence:
+        risk = consequence["risk"]
+        if not isinstance(risk, (int, float)) or not 0 <= risk <= 1:
+            errors.append(f"{where}: risk must be in [0, 1], got {risk!r}")
+        for outcome in ("success", "failure"):
+            if outcome not in consequence:
+                errors.append(f"{where}: risk-based consequence has no '{outcome}'")
+            else:
+                validate_consequence(consequence[outcome], f"{where}.{outcome}", errors)
+        return
+
+    if "text" not in consequence:
+        errors.append(f"{where}: consequence has no 'text'")
+    for field, value in consequence.get("modifier", {}).items():
+        if field not in MODIFIER_FIELDS:
+            errors.append(f"{where}: unknown modifier field '{field}'")
+        elif not isinstance(value, int):
+            errors.append(f"{where}: modifier '{field}' must be an integer, got {value!r}")
+
+
+def validate_story(source: dict, base_dir: str) -> list[str]:
+    """Проверяет сюжет и возвращает список найденных ошибок (пустой, если ошибок нет)."""
+    errors = []
+    scenes = source.get("scenes")
+    if not isinstance(scenes, list) or not scenes:
+        return ["story has no scenes"]
+
+    for scene_index, scene in enumerate(scenes):
+        where = f"scene {scene_index + 1} ({scene.get('title', '?')})"
+        if not isinstance(scene.get("id", ""), str):
+            errors.append(f"{where}: id must be a string, got {scene['id']!r}")
+        for field in ("title", "text", "date", "background", "choices"):
+            if field not in scene:
+                errors.append(f"{where}: missing '{field}'")
+
+        if "date" in scene:
+            try:
+                date = parse_date(scene["date"])
+            except (TypeError, ValueError):
+                errors.append(f"{where}: date must be YYYY-MM-DD, got {scene['date']!r}")
+            else:
+                if not BLOCKADE_START <= date <= BLOCKADE_END:
+                    errors.append(f"{where}: date {scene['date']} is outside "
+                                  f"{BLOCKADE_START.date()}..{BLOCKADE_END.date()}")
+
+        background = scene.get("background", {})
+        if "image" in background:
+            if not os.path.isfile(os.path.join(base_dir, background["image"])):
+                errors.append(f"{where}: background image '{background['image']}' not found")
+        elif "texture" in background:
+            color = background["texture"]
+            if not (isinstance(color, list) and len(color) == 3 and all(0 <= channel <= 255 for channel in color)):
+                errors.append(f"{where}: texture color must be [r, g, b], got {color!r}")
+        elif "background" in scene:
+            errors.append(f"{where}: background must have 'image' or 'texture'")
+
+        sound = scene.get("sound")
+        if isinstance(sound, dict):
+            if not isinstance(sound.get("stream", False), bool):
+                errors.append(f"{where}: sound stream must be true or false, got {sound['stream']!r}")
+            sound = sound.get("file")
+            if sound is None:
+                errors.append(f"{where}: sound must have 'file'")
+        if sound is not None and not isinstance(sound, str):
+            errors.append(f"{where}: sound must be a file name, got {sound!r}")
+        elif sound and not os.path.isfile(os.path.join(base_dir, sound)):
+            errors.append(f"{where}: sound '{sound}' not found")
+
+        choices = scene.get("choices", [])
+        if "choices" in scene and not choices:
+            errors.append(f"{where}: scene has no choices")
+        for choice_index, choice in enumerate(choices):
+            choice_where = f"{where}, choice {choice_index + 1}"
+            if "text" not in choice:
+                errors.append(f"{choice_where}: missing 'text'")
+            if not isinstance(choice.get("next", ""), str):
+                errors.append(f"{choice_where}: next must be a scene id, got {choice['next']!r}")
+            if "consequence" not in choice:
+                errors.append(f"{choice_where}: missing 'consequence'")
+            else:
+                validate_consequence(choice["consequence"], choice_where, errors)
+
+    if not errors:
+        errors.extend(validate_graph(scenes))
+    return errors
+
+
+def story_successors(scenes: list[dict]) -> tuple[list[list[int]], list[str]]:
+    """Возвращает таблицу переходов сюжета и ошибки в идентификаторах сцен."""
+    return resolve_successors(
+        [scene.get("id") for scene in scenes],
+        [[choice.get("next") for choice in scene["choices"]] for scene in scenes]
+    )
+
+
+def validate_graph(scenes: list[dict]) -> list[str]:
+    """Проверяет переходы между сценами: ссылки, циклы, недостижимые и тупиковые сцены."""
+    successors, errors = story_successors(scenes)
+    if errors:
+        return errors
+
+    def describe(indices: list[int]) -> str:
+        return ", ".join(f"{index + 1} ({scenes[index].get('title', '?')})" for index in indices)
+
+    _, cyclic = topological_order(successors)
+    if cyclic:
+        return [f"scenes in or after a cycle: {describe(cyclic)}"]
+    graph = StoryGraph(successors)
+    if graph.unreachable():
+        errors.append(f"scenes unreachable from the first scene: {describe(graph.unreachable())}")
+    if graph.dead_ends():
+        errors.append(f"scenes that never reach the end of the story: {describe(graph.dead_ends())}")
+    return errors
+
+
+def compile_story_data(source: dict, base_dir: str) -> bytes:
+    """Проверяет сюжет и возвращает его в скомпилированном виде."""
+    errors = validate_story(source, base_dir)
+    if errors:
+        raise StoryError(errors)
+
+    successors, _ = story_successors(source["scenes"])
+    records = [
+        json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        for record in [*source["scenes"], {"successors": successors}]
+    ]
+    index_size = HEADER.size + OFFSET.size * (len(records) + 1)
+    offsets = [index_size]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+
+    return b"".join([
+        HEADER.pack(MAGIC, FORMAT_VERSION, len(records) - 1),
+        *(OFFSET.pack(offset) for offset in offsets),
+        *records,
+    ])
+
+
+def compile_story(source_path: str = DEFAULT_SOURCE, output_path: str = DEFAULT_COMPILED) -> bytes:
+    """Компилирует файл сюжета и сохраняет результат в `output_path`."""
+    with open(source_path, encoding="utf-8") as file:
+        source = json.load(file)
+    data = compile_story_data(source, os.path.dirname(os.path.abspath(source_path)))
+
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+        # Иначе после сбоя питания на месте файла может оказаться пустой файл
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, output_path)
+    return data
+
+
+def consequence_from_dict(data: dict) -> SimpleConsequence | RiskBasedConsequence:
+    if "risk" in data:
+        return RiskBasedConsequence(
+            risk=data["risk"],
+            success=consequence_from_dict(data["success"]),
+            failure=consequence_from_dict(data["failure"])
+        )
+    return SimpleConsequence(text=data["text"], modifier=PlayerStatsModifier(**data.get("modifier", {})))
+
+
+def scene_from_dict(data: dict, base_dir: str = "") -> Scene:
+    """Создает сцену из записи сюжета.
+
+    Пути к картинкам и звукам в сюжете указываются относительно файла сюжета,
+    поэтому в ссылках они дополняются папкой `base_dir`."""
+    background = data["background"]
+    if "image" in background:
+        background_ref = ImageRef(os.path.join(base_dir, background["image"]))
+    else:
+        background_ref = TextureRef(tuple(background["texture"]), seed=background.get("seed"))
+
+    sound = data.get("sound")
+    if isinstance(sound, dict):
+        sound_ref = SoundRef(os.path.join(base_dir, sound["file"]), stream=sound.get("stream"))
+    else:
+        sound_ref = SoundRef(os.path.join(base_dir, sound)) if sound else None
+
+    return Scene(
+        title=data["title"],
+        text=data["text"],
+        background=background_ref,
+        sound=sound_ref,
+        choices=[
+            Choice(
+                text=choice["text"],
+                consequence=consequence_from_dict(choice["consequence"]),
+                next_scene=choice.get("next")
+            )
+            for choice in data["choices"]
+        ],
+        date=parse_date(data["date"]),
+        scene_id=data.get("id")
+    )
+
+
+class CompiledStory(Sequence):
+    """Этот класс описывает скомпилированный сюжет как последовательность сцен.
+
+    Читается только заголовок; сцены разбираются при первом обращении и запоминаются."""
+
+    def __init__(self, data, path: str | None = None, base_dir: str = ""):
+        self.data = data
+        """Содержимое файла (отображение в память или байты)."""
+        self.path = path
+        """Путь к файлу (нужен для передачи сюжета в другие процессы)."""
+        self.base_dir = base_dir
+        """Папка исходного файла сюжета, относительно которой указаны картинки и звуки."""
+        if len(data) < HEADER.size:
+            raise StoryError(["compiled story is truncated"])
+        magic, version, self.scene_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise StoryError([f"not a compiled story (version {FORMAT_VERSION})"])
+        # Последнее смещение индекса - конец последней записи, то есть конец файла
+        index_end = HEADER.size + OFFSET.size * (self.scene_count + 2)
+        if len(data) < index_end or OFFSET.unpack_from(data, index_end - OFFSET.size)[0] != len(data):
+            raise StoryError(["compiled story is truncated"])
+        self.scenes: dict[int, Scene] = {}
+        """Уже разобранные сцены."""
+        self._graph: StoryGraph | None = None
+
+    def record(self, index: int) -> dict:
+        """Возвращает запись с номером `index` (после сцен идет граф переходов)."""
+        start, end = struct.unpack_from("<QQ", self.data, HEADER.size + OFFSET.size * index)
+        return json.loads(bytes(self.data[start:end]).decode("utf-8"))
+
+    @property
+    def graph(self) -> StoryGraph:
+        """Граф переходов сюжета с индексом достижимости (строится при первом обращении)."""
+        if self._graph is None:
+            self._graph = StoryGraph(self.record(self.scene_count)["successors"])
+        return self._graph
+
+    @classmethod
+    def open(cls, path: str, base_dir: str | None = None) -> "CompiledStory":
+        """Отображает скомпилированный сюжет в память (`base_dir` по умолчанию - папка файла)."""
+        if base_dir is None:
+            base_dir = os.path.dirname(os.path.abspath(path))
+        with open(path, "rb") as file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), path, base_dir)
+
+    def __len__(self) -> int:
+        return self.scene_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.scene_count))]
+        if index < 0:
+            index += self.scene_count
+        if not 0 <= index < self.scene_count:
+            raise IndexError("scene index out of range")
+
+        scene = self.scenes.get(index)
+        if scene is None:
+            scene = scene_from_dict(self.record(index), self.base_dir)
+            self.scenes[index] = scene
+        return scene
+
+    def __reduce__(self):
+        # Отображение в память не передается в другие процессы - там файл открывается заново
+        if self.path is not None:
+            return (CompiledStory.open, (self.path, self.base_dir))
+        return (CompiledStory, (bytes(self.data), None, self.base_dir))
+
+
+def load_story(source_path: str = DEFAULT_SOURCE, compiled_path: str = DEFAULT_COMPILED) -> CompiledStory:
+    """Возвращает скомпилированный сюжет, перекомпилируя его, если исходный файл новее,
+    файл собран другой версией компилятора или поврежден (например, пуст после сбоя)."""
+    base_dir = os.path.dirname(os.path.abspath(source_path))
+    try:
+        is_stale = os.path.getmtime(compiled_path) < os.path.getmtime(source_path)
+    except OSError:
+        is_stale = True
+
+    if not is_stale:
+        try:
+            return CompiledStory.open(compiled_path, base_dir)
+        except (StoryError, ValueError, struct.error, OSError):
+            # Пустой файл не отображается в память (ValueError), обрезанный не читается
+            pass
+
+    try:
+        compile_story(source_path, compiled_path)
+    except OSError:
+        # Папка только для чтения - компилируем в память
+        with open(source_path, encoding="utf-8") as file:
+            source = json.load(file)
+        return CompiledStory(compile_story_data(source, base_dir), base_dir=base_dir)
+    return CompiledStory.open(compiled_path, base_dir)
+
+
+def main():
+    source_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOURCE
+    output_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_COMPILED
+    try:
+        data = compile_story(source_path, output_path)
+    except StoryError as error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
+    story = CompiledStory(data)
+    print(f"{output_path}: {len(story)} сцен, {len(data)} байт")
+
+
+if __name__ == "__main__":
+    main()
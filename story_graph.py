@@ -0,0 +1,157 @@
+"""Граф сцен сюжета.
+
+Каждый вариант выбора ведет в какую-то сцену (или к концу игры), поэтому сюжет -
+ориентированный граф. При загрузке для него один раз строится индекс:
+топологический порядок, множества достижимых сцен и длины самых длинных путей.
+По индексу игра загружает только фоны сцен, до которых можно дойти, а компилятор
+находит циклы и сцены, в которые нельзя попасть.
+"""
+from collections import deque
+from collections.abc import Sequence
+from story import Scene, STORY_END
+
+# Номер "сцены" конца игры в таблице переходов
+END = -1
+
+
+def resolve_successors(scene_ids: list[str | None], targets: list[list[str | None]]) -> tuple[list[list[int]], list[str]]:
+    """Переводит идентификаторы следующих сцен в номера.
+
+    `targets[scene][choice]` - идентификатор сцены, `STORY_END` или `None` (следующая
+    сцена по порядку, после последней - конец игры). Возвращает таблицу переходов и
+    список ошибок."""
+    errors = []
+    indices = {}
+    for index, scene_id in enumerate(scene_ids):
+        if scene_id is None:
+            continue
+        if scene_id == STORY_END:
+            errors.append(f"scene {index + 1}: id '{STORY_END}' is reserved for the end of the story")
+        elif scene_id in indices:
+            errors.append(f"scene {index + 1}: duplicate id '{scene_id}' (also scene {indices[scene_id] + 1})")
+        else:
+            indices[scene_id] = index
+
+    successors = []
+    for index, scene_targets in enumerate(targets):
+        row = []
+        for choice_index, target in enumerate(scene_targets):
+            if target is None:
+                row.append(index + 1 if index + 1 < len(scene_ids) else END)
+            elif target == STORY_END:
+                row.append(END)
+            elif target in indices:
+                row.append(indices[target])
+            else:
+                errors.append(f"scene {index + 1}, choice {choice_index + 1}: unknown next scene '{target}'")
+                row.append(END)
+        successors.append(row)
+    return successors, errors
+
+
+def topological_order(successors: list[list[int]]) -> tuple[list[int], list[int]]:
+    """Возвращает сцены в топологическом порядке и сцены, входящие в циклы (или идущие после них)."""
+    incoming = [0] * len(successors)
+    for row in successors:
+        for target in set(row):
+            if target != END:
+                incoming[target] += 1
+
+    queue = deque(index for index, count in enumerate(incoming) if count == 0)
+    order = []
+    while queue:
+        index = queue.popleft()
+        order.append(index)
+        for target in set(successors[index]):
+            if target != END:
+                incoming[target] -= 1
+                if incoming[target] == 0:
+                    queue.append(target)
+    return order, [index for index, count in enumerate(incoming) if count > 0]
+
+
+class StoryGraph:
+    """Этот класс описывает граф сцен вместе с индексом достижимости.
+
+    `successors[scene][choice]` - номер сцены, в которую ведет вариант, или `END`.
+    Игра начинается со сцены `start`; граф должен быть ациклическим."""
+
+    def __init__(self, successors: list[list[int]], start: int = 0):
+        self.successors = successors
+        """Таблица переходов."""
+        self.start = start
+        """Номер первой сцены."""
+        self.order, cyclic = topological_order(successors)
+        """Сцены в топологическом порядке: каждая сцена стоит раньше всех сцен, в которые из нее можно попасть."""
+        if cyclic:
+            raise ValueError("story graph has a cycle through scenes " + ", ".join(str(index + 1) for index in cyclic))
+
+        self.reachable = [0] * len(successors)
+        """Сцены, достижимые из каждой сцены (включая ее саму), как битовая маска."""
+        self.remaining = [0] * len(successors)
+        """Количество сцен на самом длинном пути от сцены (включая ее) до конца игры."""
+        self.can_end = [False] * len(successors)
+        """Можно ли из сцены дойти до конца игры."""
+        for index in reversed(self.order):
+            mask = 1 << index
+            for target in successors[index]:
+                if target == END:
+                    self.remaining[index] = max(self.remaining[index], 1)
+                    self.can_end[index] = True
+                else:
+                    mask |= self.reachable[target]
+                    self.remaining[index] = max(self.remaining[index], self.remaining[target] + 1)
+                    self.can_end[index] |= self.can_end[target]
+            self.reachable[index] = mask
+
+    @classmethod
+    def from_scenes(cls, scenes: Sequence[Scene]) -> "StoryGraph":
+        """Строит граф по идентификаторам сцен и переходам вариантов."""
+        successors, errors = resolve_successors(
+            [scene.scene_id for scene in scenes],
+            [[choice.next_scene for choice in scene.choices] for scene in scenes]
+        )
+        if errors:
+            raise ValueError("\n".join(errors))
+        return cls(successors)
+
+    def __len__(self) -> int:
+        return len(self.successors)
+
+    def is_reachable(self, source: int, target: int) -> bool:
+        """Можно ли попасть из сцены `source` в сцену `target`."""
+        return bool(self.reachable[source] >> target & 1)
+
+    def unreachable(self) -> list[int]:
+        """Сцены, в которые нельзя попасть из первой сцены."""
+        return [index for index in range(len(self)) if not self.is_reachable(self.start, index)]
+
+    def dead_ends(self) -> list[int]:
+        """Сцены, из которых нельзя дойти до конца игры."""
+        return [index for index in range(len(self)) if not self.can_end[index]]
+
+    def within(self, source: int, depth: int) -> list[int]:
+        """Сцены, до которых из `source` не больше `depth` переходов, в порядке удаления."""
+        seen = {source}
+        result = [source]
+        frontier = [source]
+        for _ in range(depth):
+            next_frontier = []
+            for index in frontier:
+                for target in self.successors[index]:
+                    if target != END and target not in seen:
+                        seen.add(target)
+                        next_frontier.append(target)
+            result.extend(next_frontier)
+            frontier = next_frontier
+        return result
+
+    def longest_path(self) -> int:
+        """Количество сцен на самом длинном прохождении."""
+        return self.remaining[self.start] if self.successors else 0
+
+
+def graph_of(scenes: Sequence[Scene]) -> StoryGraph:
+    """Возвращает граф сюжета: готовый индекс скомпилированного сюжета или построенный по сценам."""
+    graph = getattr(scenes, "graph", None)
+    return graph if graph is not None else StoryGraph.from_scenes(scenes)
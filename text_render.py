@@ -0,0 +1,267 @@
+import os
+import pygame
+from collections import OrderedDict
+
+# Ограничения кэшей
+MAX_CACHED_LINES = 512
+MAX_CACHED_WRAPS = 256
+MAX_CACHED_WORDS = 4096
+MAX_CACHED_ATLASES = 32
+
+# Рисовать текст из атласа глифов вместо отрисовки строк шрифтом (GAME_GLYPH_ATLAS=1)
+USE_GLYPH_ATLAS = os.environ.get("GAME_GLYPH_ATLAS", "0") != "0"
+# Символы, которые заранее отрисовываются в атлас
+ATLAS_CHARACTERS = (
+    "".join(chr(code) for code in range(32, 127))
+    + "АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯабвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+    + "—–«»„“”’…№°"
+)
+# Ширина поверхности атласа
+ATLAS_WIDTH = 1024
+
+
+class GlyphAtlas:
+    """Этот класс описывает атлас глифов: все символы `ATLAS_CHARACTERS` одного шрифта
+    и цвета, заранее отрисованные на одной поверхности.
+
+    Строка рисуется одним вызовом `Surface.blits` по кусочкам атласа, поэтому
+    меняющиеся строки (например, числа на панели параметров) не отрисовываются
+    шрифтом заново. Расстояние между символами берется из `Font.metrics` без учета
+    кернинга, так что строка может отличаться от `Font.render` на пиксель-другой."""
+
+    def __init__(self, font: pygame.font.Font, color, antialias: bool = True):
+        self.line_height = font.get_height()
+        """Высота строки."""
+        self.rects: dict[str, pygame.Rect] = {}
+        """Область каждого символа на поверхности атласа (у пробелов и других пустых символов ее нет)."""
+        self.advances: dict[str, int] = {}
+        """Сдвиг пера после каждого символа."""
+
+        glyphs = {}
+        for character, metrics in zip(ATLAS_CHARACTERS, font.metrics(ATLAS_CHARACTERS)):
+            if metrics is None:
+                continue
+            self.advances[character] = metrics[4]
+            glyph = font.render(character, antialias, color)
+            # Пустые символы только сдвигают перо, копировать их незачем
+            if glyph.get_bounding_rect().width:
+                glyphs[character] = glyph
+
+        # Символы раскладываются по строкам атласа слева направо
+        x = y = 0
+        for character, glyph in glyphs.items():
+            if x + glyph.get_width() > ATLAS_WIDTH:
+                x, y = 0, y + self.line_height
+            self.rects[character] = pygame.Rect((x, y), glyph.get_size())
+            x += glyph.get_width()
+
+        self.surface = pygame.Surface((ATLAS_WIDTH, y + self.line_height), pygame.SRCALPHA)
+        """Поверхность атласа."""
+        for character, glyph in glyphs.items():
+            # Копирование без смешивания: атлас прозрачный, а глифы не пересекаются
+            self.surface.blit(glyph, self.rects[character], special_flags=pygame.BLEND_RGBA_MAX)
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+
+    def line_width(self, line: str) -> int | None:
+        """Возвращает ширину строки или `None`, если в атласе нет какого-то символа."""
+        try:
+            return sum(self.advances[character] for character in line)
+        except KeyError:
+            return None
+
+    def draw(self, surface: pygame.Surface, line: str, position: tuple[int, int]):
+        """Рисует строку из атласа (все символы строки должны быть в атласе)."""
+        x, y = position
+        blits = []
+        for character in line:
+            rect = self.rects.get(character)
+            if rect is not None:
+                blits.append((self.surface, (x, y), rect))
+            x += self.advances[character]
+        surface.blits(blits, doreturn=False)
+
+
+class TextCache:
+    """Этот класс хранит уже отрисованные строки текста и результаты разбиения текста на строки.
+
+    Оба кэша ограничены по размеру и вытесняют давно не использованные записи (LRU).
+    Кроме того, хранится ширина уже измеренных слов для каждого шрифта."""
+
+    def __init__(self, max_lines: int = MAX_CACHED_LINES, max_wraps: int = MAX_CACHED_WRAPS,
+                 max_words: int = MAX_CACHED_WORDS):
+        self.max_lines = max_lines
+        """Максимальное количество отрисованных строк в кэше."""
+        self.max_wraps = max_wraps
+        """Максимальное количество результатов разбиения в кэше."""
+        self.lines: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+        """Отрисованные строки по ключу (шрифт, строка, сглаживание, цвет)."""
+        self.wraps: OrderedDict[tuple, list[str]] = OrderedDict()
+        """Разбиения текста по ключу (текст, шрифт, ширина)."""
+        self.max_words = max_words
+        """Максимальное количество измеренных слов одного шрифта."""
+        self.word_widths: dict[pygame.font.Font, dict[str, int]] = {}
+        """Ширина измеренных слов по шрифту."""
+        self.atlases: OrderedDict[tuple, GlyphAtlas] = OrderedDict()
+        """Атласы глифов по ключу (шрифт, цвет, сглаживание)."""
+        self.line_hits = 0
+        self.line_misses = 0
+        self.wrap_hits = 0
+        self.wrap_misses = 0
+
+    def render(self, font: pygame.font.Font, line: str, antialias: bool, color) -> pygame.Surface:
+        """Возвращает поверхность с отрисованной строкой, используя кэш."""
+        key = (font, line, antialias, tuple(color))
+        surface = self.lines.get(key)
+        if surface is not None:
+            self.lines.move_to_end(key)
+            self.line_hits += 1
+            return surface
+
+        self.line_misses += 1
+        surface = font.render(line, antialias, color)
+        self.lines[key] = surface
+        if len(self.lines) > self.max_lines:
+            self.lines.popitem(last=False)
+        return surface
+
+    def wrap(self, text: str, font: pygame.font.Font, width: int, wrap_func) -> list[str]:
+        """Возвращает разбиение текста на строки, вызывая `wrap_func` только при промахе."""
+        key = (text, font, width)
+        lines = self.wraps.get(key)
+        if lines is not None:
+            self.wraps.move_to_end(key)
+            self.wrap_hits += 1
+            return lines
+
+        self.wrap_misses += 1
+        lines = wrap_func()
+        self.wraps[key] = lines
+        if len(self.wraps) > self.max_wraps:
+            self.wraps.popitem(last=False)
+        return lines
+
+    def atlas(self, font: pygame.font.Font, color, antialias: bool = True) -> GlyphAtlas:
+        """Возвращает атлас глифов шрифта и цвета, создавая его при первом запросе."""
+        key = (font, tuple(color), antialias)
+        atlas = self.atlases.get(key)
+        if atlas is not None:
+            self.atlases.move_to_end(key)
+            return atlas
+
+        atlas = GlyphAtlas(font, color, antialias)
+        self.atlases[key] = atlas
+        if len(self.atlases) > MAX_CACHED_ATLASES:
+            self.atlases.popitem(last=False)
+        return atlas
+
+    def draw_line(self, surface: pygame.Surface, font: pygame.font.Font, line: str, antialias: bool, color,
+                  position: tuple[int, int], center: bool = False) -> int:
+        """Рисует строку из атласа глифов (или отрисованную шрифтом, если в атласе нет
+        какого-то символа или атлас выключен) и возвращает высоту строки.
+
+        При `center=True` `position[0]` - середина строки."""
+        x, y = position
+        if USE_GLYPH_ATLAS:
+            atlas = self.atlas(font, color, antialias)
+            width = atlas.line_width(line)
+            if width is not None:
+                atlas.draw(surface, line, (x - width // 2 if center else x, y))
+                return atlas.line_height
+
+        text_surface = self.render(font, line, antialias, color)
+        surface.blit(text_surface, (x - text_surface.get_width() // 2 if center else x, y))
+        return text_surface.get_height()
+
+    def word_width(self, font: pygame.font.Font, word: str) -> int:
+        """Возвращает ширину слова, измеряя каждое слово шрифта только один раз."""
+        widths = self.word_widths.get(font)
+        if widths is None:
+            widths = self.word_widths[font] = {}
+        width = widths.get(word)
+        if width is None:
+            if len(widths) >= self.max_words:
+                widths.clear()
+            width = widths[word] = font.size(word)[0]
+        return width
+
+    def stats(self) -> dict[str, int]:
+        """Возвращает счетчики попаданий и промахов кэшей."""
+        return {
+            "line_hits": self.line_hits,
+            "line_misses": self.line_misses,
+            "lines_cached": len(self.lines),
+            "wrap_hits": self.wrap_hits,
+            "wrap_misses": self.wrap_misses,
+            "wraps_cached": len(self.wraps),
+            "words_cached": sum(len(widths) for widths in self.word_widths.values()),
+        }
+
+    def clear(self):
+        """Очищает кэши и сбрасывает счетчики."""
+        self.lines.clear()
+        self.wraps.clear()
+        self.word_widths.clear()
+        self.atlases.clear()
+        self.line_hits = self.line_misses = 0
+        self.wrap_hits = self.wrap_misses = 0
+
+
+text_cache = TextCache()
+"""Общий кэш текста, используемый `Text`."""
+
+
+def break_word(word: str, font: pygame.font.Font, width: int) -> list[str]:
+    """Разбивает слово, не помещающееся в ширину `width`, на куски, которые помещаются.
+
+    Длина каждого куска подбирается двоичным поиском; кусок - хотя бы один символ."""
+    pieces = []
+    start = 0
+    while start < len(word):
+        low, high = start + 1, len(word)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if font.size(word[start:middle])[0] < width:
+                low = middle
+            else:
+                high = middle - 1
+        pieces.append(word[start:low])
+        start = low
+    return pieces
+
+
+def wrap_lines(text: str, font: pygame.font.Font, width: int, cache: TextCache = text_cache) -> list[str]:
+    """Разбивает текст на строки не шире `width` за один проход по словам.
+
+    Ширина строки складывается из ширины слов (каждое слово измеряется один раз, см.
+    `TextCache.word_width`) и ширины пробелов. Переносы строк в тексте сохраняются,
+    а слова шире `width` разбиваются на части. При `width <= 0` текст делится только
+    по переносам строк."""
+    paragraphs = text.split('\n')
+    if width <= 0:
+        return paragraphs
+
+    space_width = cache.word_width(font, ' ')
+    lines = []
+    for paragraph in paragraphs:
+        line_words: list[str] = []
+        line_width = 0
+        for word in paragraph.split(' '):
+            word_width = cache.word_width(font, word)
+            candidate_width = line_width + space_width + word_width if line_words else word_width
+            if candidate_width < width:
+                line_words.append(word)
+                line_width = candidate_width
+                continue
+
+            if line_words:
+                lines.append(' '.join(line_words))
+            if word_width >= width:
+                pieces = break_word(word, font, width)
+                lines.extend(pieces[:-1])
+                word = pieces[-1]
+                word_width = cache.word_width(font, word)
+            line_words = [word]
+            line_width = word_width
+        lines.append(' '.join(line_words))
+    return lines
@@ -0,0 +1,99 @@
+"""Компактное хранилище прохождений.
+
+Каждое поле `PlayerStats` хранится отдельным массивом целых чисел фиксированной
+ширины размером (прохождения, сцены + 1): значение перед первой сценой и после
+каждой сыгранной сцены по порядку прохождения. Номера выбранных вариантов хранятся
+массивом (прохождения, сцены) по номерам сцен.
+На диске каждый столбец - отдельный файл `.npy`, который загружается через mmap
+без копирования.
+"""
+import os
+import json
+import numpy
+from story import PlayerStats
+
+# Ширина столбцов (значения еды, здоровья и духа ограничены MAX_*)
+COLUMN_DTYPES = {
+    "food": numpy.int16,
+    "health": numpy.int8,
+    "morale": numpy.int8,
+    "total_delivered": numpy.int32,
+    "evacuated": numpy.int32,
+    "choice": numpy.int8,
+    "length": numpy.int16,
+}
+STAT_COLUMNS = ("food", "health", "morale", "total_delivered", "evacuated")
+FORMAT_VERSION = 1
+
+
+class TrajectoryStore:
+    """Этот класс хранит множество прохождений по столбцам.
+
+    `length[run]` - сколько сцен сыграно в прохождении; `choice[run, scene]` равен -1
+    для сцен, в которые прохождение не попало, а параметры после поражения не меняются."""
+
+    def __init__(self, columns: dict[str, numpy.ndarray]):
+        self.columns = columns
+        """Столбцы хранилища по именам из `COLUMN_DTYPES`."""
+
+    @classmethod
+    def empty(cls, runs: int, scene_count: int) -> "TrajectoryStore":
+        """Создает хранилище для `runs` прохождений по `scene_count` сценам."""
+        columns = {field: numpy.zeros((runs, scene_count + 1), dtype=COLUMN_DTYPES[field]) for field in STAT_COLUMNS}
+        columns["choice"] = numpy.full((runs, scene_count), -1, dtype=COLUMN_DTYPES["choice"])
+        columns["length"] = numpy.zeros(runs, dtype=COLUMN_DTYPES["length"])
+        return cls(columns)
+
+    @property
+    def runs(self) -> int:
+        """Количество прохождений."""
+        return len(self.columns["length"])
+
+    @property
+    def scene_count(self) -> int:
+        """Количество сцен."""
+        return self.columns["choice"].shape[1]
+
+    def __getitem__(self, column: str) -> numpy.ndarray:
+        return self.columns[column]
+
+    def nbytes(self) -> int:
+        """Объем данных в байтах."""
+        return sum(column.nbytes for column in self.columns.values())
+
+    def record_stats(self, step: int, runs, stats: dict[str, numpy.ndarray]):
+        """Записывает параметры прохождений `runs` после `step` сцен (0 - начало игры).
+
+        Значения записываются и во все следующие шаги, так что после поражения
+        параметры остаются последними известными."""
+        for field in STAT_COLUMNS:
+            self.columns[field][runs, step:] = stats[field][:, None]
+
+    def record_choices(self, scene_index: int, runs, choices: numpy.ndarray):
+        """Записывает выбранные в сцене варианты для прохождений `runs` (каждая сцена - один шаг)."""
+        self.columns["choice"][runs, scene_index] = choices
+        self.columns["length"][runs] += 1
+
+    def stats_at(self, run: int, step: int) -> PlayerStats:
+        """Возвращает параметры одного прохождения после `step` сцен."""
+        return PlayerStats(*(int(self.columns[field][run, step]) for field in STAT_COLUMNS))
+
+    def save(self, directory: str):
+        """Сохраняет хранилище в папку: по файлу `.npy` на столбец."""
+        os.makedirs(directory, exist_ok=True)
+        for name, column in self.columns.items():
+            numpy.save(os.path.join(directory, f"{name}.npy"), column)
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump({"version": FORMAT_VERSION, "runs": self.runs, "scene_count": self.scene_count}, file)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str | None = "r") -> "TrajectoryStore":
+        """Загружает хранилище; по умолчанию столбцы отображаются в память без копирования."""
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as file:
+            meta = json.load(file)
+        if meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported trajectory store version: {meta['version']}")
+        return cls({
+            name: numpy.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in COLUMN_DTYPES
+        })